@@ -0,0 +1,128 @@
+import argparse
+import json
+import time
+import tracemalloc
+
+from generate import random_puzzle
+from logic import *
+
+
+def run_model_check(knowledge, symbols):
+    stats = dict()
+    entailed = [model_check(knowledge, symbol, stats) for symbol in symbols]
+    return entailed, stats["visited"]
+
+
+def run_model_check_many(knowledge, symbols):
+    stats = dict()
+    result = model_check_many(knowledge, symbols, stats)
+    return [result[symbol] is True for symbol in symbols], stats["visited"]
+
+
+def run_bdd(knowledge, symbols):
+    bdd = BDD()
+    compiled = bdd.compile(knowledge)
+    entailed = [bdd.entails(compiled, symbol) for symbol in symbols]
+    return entailed, len(bdd.nodes)
+
+
+def run_resolution(knowledge, symbols):
+    results = [resolution_check(knowledge, symbol) for symbol in symbols]
+    return ([result.entailed for result in results],
+            sum(result.generated for result in results))
+
+
+# Inference backends, and what "visited" counts for each of them
+BACKENDS = {
+    "model_check": (run_model_check, "partial models"),
+    "model_check_many": (run_model_check_many, "partial models"),
+    "bdd": (run_bdd, "BDD nodes"),
+    "resolution": (run_resolution, "clauses generated"),
+}
+
+# Backends that enumerate assignments and so are capped by --max-symbols
+ENUMERATING = {"model_check", "model_check_many"}
+
+
+def measure(backend, knowledge, symbols):
+    """
+    Runs one backend on a puzzle, returning its answers along with the
+    elapsed time, the work it reports, and peak traced memory.
+
+    Tracing allocations slows some backends far more than others, so the
+    time comes from an untraced run and the peak memory from a second,
+    traced run.
+    """
+    run, _ = BACKENDS[backend]
+    start = time.perf_counter()
+    entailed, visited = run(knowledge, symbols)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    run(knowledge, symbols)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return entailed, {
+        "seconds": elapsed,
+        "visited": visited,
+        "peak_bytes": peak,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Time each inference backend on random "
+                    "knights and knaves puzzles of growing size."
+    )
+    parser.add_argument("--sizes", type=int, nargs="+", default=[2, 4, 6, 8],
+                        help="numbers of inhabitants to try")
+    parser.add_argument("--statements", type=float, default=1.0,
+                        help="statements per inhabitant")
+    parser.add_argument("--trials", type=int, default=3,
+                        help="puzzles per size")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS),
+                        choices=list(BACKENDS))
+    parser.add_argument("--max-symbols", type=int, default=20,
+                        help="skip enumerating backends above this size")
+    parser.add_argument("--json", action="store_true",
+                        help="print results as JSON")
+    args = parser.parse_args()
+
+    rows = []
+    for n in args.sizes:
+        m = max(1, round(n * args.statements))
+        for trial in range(args.trials):
+            seed = args.seed + 1000 * n + trial
+            knowledge, symbols, _ = random_puzzle(n, m, seed)
+            answers = dict()
+            for backend in args.backends:
+                if (backend in ENUMERATING
+                        and len(knowledge.symbols()) > args.max_symbols):
+                    continue
+                entailed, row = measure(backend, knowledge, symbols)
+                answers[backend] = entailed
+                row.update(backend=backend, inhabitants=n, statements=m,
+                           trial=trial)
+                rows.append(row)
+
+            # Every backend must reach the same conclusions
+            if len(set(map(tuple, answers.values()))) > 1:
+                raise Exception(f"backends disagree on puzzle seed {seed}")
+
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return
+
+    print(f"{'backend':<18}{'N':>4}{'M':>4}{'seconds':>12}"
+          f"{'visited':>12}{'peak KiB':>12}")
+    for row in rows:
+        print(f"{row['backend']:<18}{row['inhabitants']:>4}"
+              f"{row['statements']:>4}{row['seconds']:>12.5f}"
+              f"{row['visited']:>12}{row['peak_bytes'] / 1024:>12.1f}")
+    for backend in args.backends:
+        print(f"visited for {backend}: {BACKENDS[backend][1]}")
+
+
+if __name__ == "__main__":
+    main()
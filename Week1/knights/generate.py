@@ -0,0 +1,89 @@
+import random
+import string
+import sys
+
+from logic import *
+
+
+def inhabitants(n):
+    """
+    Returns (name, knight symbol, knave symbol) for n inhabitants,
+    named A, B, C, ... and then A1, B1, C1, ...
+    """
+    people = []
+    for i in range(n):
+        name = string.ascii_uppercase[i % 26]
+        if i >= 26:
+            name += str(i // 26)
+        people.append((
+            name,
+            Symbol(f"{name} is a Knight"),
+            Symbol(f"{name} is a Knave")
+        ))
+    return people
+
+
+def random_claim(rng, people, depth=2):
+    """
+    Returns a random claim about the inhabitants, built from "X is a
+    knight/knave" atoms with And, Or and Not, nested up to `depth` deep.
+    """
+    if depth == 0 or rng.random() < 0.4:
+        _, knight, knave = rng.choice(people)
+        return rng.choice([knight, knave])
+    kind = rng.choice(["and", "or", "not"])
+    if kind == "not":
+        return Not(random_claim(rng, people, depth - 1))
+    parts = [random_claim(rng, people, depth - 1)
+             for _ in range(rng.randint(2, 3))]
+    return And(*parts) if kind == "and" else Or(*parts)
+
+
+def random_puzzle(n, m, seed=None):
+    """
+    Returns a random knights and knaves puzzle with n inhabitants who
+    make m statements in total, as (knowledge, symbols, statements).
+
+    `statements` is a list of (speaker name, claim) pairs, and the
+    knowledge follows the encoding used in puzzle.py.
+    """
+    rng = random.Random(seed)
+    people = inhabitants(n)
+
+    # a person can be a knight or a knave but not both
+    conjuncts = [Not(Biconditional(knave, knight))
+                 for _, knight, knave in people]
+
+    # a knight's claim is true and a knave's claim is false
+    statements = []
+    for _ in range(m):
+        name, knight, knave = rng.choice(people)
+        claim = random_claim(rng, people)
+        statements.append((name, claim))
+        conjuncts.append(Or(Biconditional(knight, claim),
+                            Biconditional(knave, Not(claim))))
+
+    symbols = []
+    for _, knight, knave in people:
+        symbols.extend([knight, knave])
+    return And(*conjuncts), symbols, statements
+
+
+def main():
+    if len(sys.argv) not in [3, 4]:
+        sys.exit("Usage: python generate.py inhabitants statements [seed]")
+    n = int(sys.argv[1])
+    m = int(sys.argv[2])
+    seed = int(sys.argv[3]) if len(sys.argv) == 4 else None
+
+    knowledge, symbols, statements = random_puzzle(n, m, seed)
+    for name, claim in statements:
+        print(f"{name} says \"{claim.formula()}\"")
+    entailed = model_check_many(knowledge, symbols)
+    for symbol in symbols:
+        if entailed[symbol]:
+            print(f"    {symbol}")
+
+
+if __name__ == "__main__":
+    main()
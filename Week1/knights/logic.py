@@ -1,19 +1,66 @@
+import collections
+import concurrent.futures
+import heapq
 import itertools
+import multiprocessing
+import weakref
 
 
-class Sentence():
+class _Interned(type):
+    """
+    Metaclass that, while interning is enabled, returns the existing
+    instance for a sentence built from the same class and arguments.
+    """
+
+    def __call__(cls, *args, **kwargs):
+        table = Sentence._table
+        if table is None:
+            return super().__call__(*args, **kwargs)
+        key = (cls, args, tuple(sorted(kwargs.items())))
+        instance = table.get(key)
+        if instance is None:
+            instance = super().__call__(*args, **kwargs)
+            instance._interned = True
+            table[key] = instance
+        return instance
+
+
+class Sentence(metaclass=_Interned):
+
+    # Canonical instances keyed by (class, arguments), or None when
+    # interning is disabled
+    _table = None
+    _interned = False
 
     def evaluate(self, model):
         """Evaluates the logical sentence."""
         raise Exception("nothing to evaluate")
 
+    def evaluate_partial(self, model):
+        """
+        Evaluates the logical sentence under a partial model, returning
+        True, False, or None if the value depends on unassigned symbols.
+        """
+        raise Exception("nothing to evaluate")
+
     def formula(self):
         """Returns string formula representing logical sentence."""
         return ""
 
     def symbols(self):
-        """Returns a set of all symbols in the logical sentence."""
-        return set()
+        """Returns a frozenset of all symbols in the logical sentence."""
+        return frozenset()
+
+    @classmethod
+    def interning(cls, enabled=True):
+        """
+        Turns interning on or off. While it is on, structurally equal
+        sentences are built as one shared instance.
+        """
+        if not enabled:
+            Sentence._table = None
+        elif Sentence._table is None:
+            Sentence._table = weakref.WeakValueDictionary()
 
     @classmethod
     def validate(cls, sentence):
@@ -46,51 +93,75 @@ class Symbol(Sentence):
 
     def __init__(self, name):
         self.name = name
+        self._hash = hash(("symbol", name))
+        self._symbols = frozenset([name])
 
     def __eq__(self, other):
-        return isinstance(other, Symbol) and self.name == other.name
+        return self is other or (
+            isinstance(other, Symbol) and self.name == other.name
+        )
 
     def __hash__(self):
-        return hash(("symbol", self.name))
+        return self._hash
 
     def __repr__(self):
         return self.name
 
+    def __reduce__(self):
+        return (Symbol, (self.name,))
+
     def evaluate(self, model):
         try:
             return bool(model[self.name])
         except KeyError:
             raise Exception(f"variable {self.name} not in model")
 
+    def evaluate_partial(self, model):
+        value = model.get(self.name)
+        return None if value is None else bool(value)
+
     def formula(self):
         return self.name
 
     def symbols(self):
-        return {self.name}
+        return self._symbols
 
 
 class Not(Sentence):
     def __init__(self, operand):
         Sentence.validate(operand)
         self.operand = operand
+        self._hash = hash(("not", hash(operand)))
+        self._symbols = operand.symbols()
 
     def __eq__(self, other):
-        return isinstance(other, Not) and self.operand == other.operand
+        return self is other or (
+            isinstance(other, Not)
+            and self._hash == other._hash
+            and self.operand == other.operand
+        )
 
     def __hash__(self):
-        return hash(("not", hash(self.operand)))
+        return self._hash
 
     def __repr__(self):
         return f"Not({self.operand})"
 
+    def __reduce__(self):
+        return (Not, (self.operand,))
+
     def evaluate(self, model):
         return not self.operand.evaluate(model)
 
+    def evaluate_partial(self, model):
+        value = self.operand.evaluate_partial(model)
+        return None if value is None else not value
+
     def formula(self):
         return "¬" + Sentence.parenthesize(self.operand.formula())
 
     def symbols(self):
-        return self.operand.symbols()
+        return self._symbols
 
 
 class And(Sentence):
@@ -98,14 +169,22 @@ class And(Sentence):
         for conjunct in conjuncts:
             Sentence.validate(conjunct)
         self.conjuncts = list(conjuncts)
+        self._hash = hash(
+            ("and", tuple(hash(conjunct) for conjunct in conjuncts))
+        )
+        self._symbols = frozenset().union(
+            *[conjunct.symbols() for conjunct in conjuncts]
+        )
 
     def __eq__(self, other):
-        return isinstance(other, And) and self.conjuncts == other.conjuncts
+        return self is other or (
+            isinstance(other, And)
+            and self._hash == other._hash
+            and self.conjuncts == other.conjuncts
+        )
 
     def __hash__(self):
-        return hash(
-            ("and", tuple(hash(conjunct) for conjunct in self.conjuncts))
-        )
+        return self._hash
 
     def __repr__(self):
         conjunctions = ", ".join(
@@ -113,13 +192,32 @@ class And(Sentence):
         )
         return f"And({conjunctions})"
 
+    def __reduce__(self):
+        return (And, tuple(self.conjuncts))
+
     def add(self, conjunct):
         Sentence.validate(conjunct)
+        if self._interned:
+            raise TypeError("cannot add to an interned sentence")
         self.conjuncts.append(conjunct)
+        self._hash = hash(
+            ("and", tuple(hash(conjunct) for conjunct in self.conjuncts))
+        )
+        self._symbols = self._symbols | conjunct.symbols()
 
     def evaluate(self, model):
         return all(conjunct.evaluate(model) for conjunct in self.conjuncts)
 
+    def evaluate_partial(self, model):
+        result = True
+        for conjunct in self.conjuncts:
+            value = conjunct.evaluate_partial(model)
+            if value is False:
+                return False
+            if value is None:
+                result = None
+        return result
+
     def formula(self):
         if len(self.conjuncts) == 1:
             return self.conjuncts[0].formula()
@@ -127,7 +225,7 @@ class And(Sentence):
                            for conjunct in self.conjuncts])
 
     def symbols(self):
-        return set.union(*[conjunct.symbols() for conjunct in self.conjuncts])
+        return self._symbols
 
 
 class Or(Sentence):
@@ -135,22 +233,43 @@ class Or(Sentence):
         for disjunct in disjuncts:
             Sentence.validate(disjunct)
         self.disjuncts = list(disjuncts)
+        self._hash = hash(
+            ("or", tuple(hash(disjunct) for disjunct in disjuncts))
+        )
+        self._symbols = frozenset().union(
+            *[disjunct.symbols() for disjunct in disjuncts]
+        )
 
     def __eq__(self, other):
-        return isinstance(other, Or) and self.disjuncts == other.disjuncts
+        return self is other or (
+            isinstance(other, Or)
+            and self._hash == other._hash
+            and self.disjuncts == other.disjuncts
+        )
 
     def __hash__(self):
-        return hash(
-            ("or", tuple(hash(disjunct) for disjunct in self.disjuncts))
-        )
+        return self._hash
 
     def __repr__(self):
         disjuncts = ", ".join([str(disjunct) for disjunct in self.disjuncts])
         return f"Or({disjuncts})"
 
+    def __reduce__(self):
+        return (Or, tuple(self.disjuncts))
+
     def evaluate(self, model):
         return any(disjunct.evaluate(model) for disjunct in self.disjuncts)
 
+    def evaluate_partial(self, model):
+        result = False
+        for disjunct in self.disjuncts:
+            value = disjunct.evaluate_partial(model)
+            if value is True:
+                return True
+            if value is None:
+                result = None
+        return result
+
     def formula(self):
         if len(self.disjuncts) == 1:
             return self.disjuncts[0].formula()
@@ -158,7 +277,7 @@ class Or(Sentence):
                             for disjunct in self.disjuncts])
 
     def symbols(self):
-        return set.union(*[disjunct.symbols() for disjunct in self.disjuncts])
+        return self._symbols
 
 
 class Implication(Sentence):
@@ -167,29 +286,48 @@ class Implication(Sentence):
         Sentence.validate(consequent)
         self.antecedent = antecedent
         self.consequent = consequent
+        self._hash = hash(("implies", hash(antecedent), hash(consequent)))
+        self._symbols = antecedent.symbols() | consequent.symbols()
 
     def __eq__(self, other):
-        return (isinstance(other, Implication)
-                and self.antecedent == other.antecedent
-                and self.consequent == other.consequent)
+        return self is other or (
+            isinstance(other, Implication)
+            and self._hash == other._hash
+            and self.antecedent == other.antecedent
+            and self.consequent == other.consequent
+        )
 
     def __hash__(self):
-        return hash(("implies", hash(self.antecedent), hash(self.consequent)))
+        return self._hash
 
     def __repr__(self):
         return f"Implication({self.antecedent}, {self.consequent})"
 
+    def __reduce__(self):
+        return (Implication, (self.antecedent, self.consequent))
+
     def evaluate(self, model):
         return ((not self.antecedent.evaluate(model))
                 or self.consequent.evaluate(model))
 
+    def evaluate_partial(self, model):
+        antecedent = self.antecedent.evaluate_partial(model)
+        if antecedent is False:
+            return True
+        consequent = self.consequent.evaluate_partial(model)
+        if consequent is True:
+            return True
+        if antecedent is True and consequent is False:
+            return False
+        return None
+
     def formula(self):
         antecedent = Sentence.parenthesize(self.antecedent.formula())
         consequent = Sentence.parenthesize(self.consequent.formula())
         return f"{antecedent} => {consequent}"
 
     def symbols(self):
-        return set.union(self.antecedent.symbols(), self.consequent.symbols())
+        return self._symbols
 
 
 class Biconditional(Sentence):
@@ -198,66 +336,790 @@ class Biconditional(Sentence):
         Sentence.validate(right)
         self.left = left
         self.right = right
+        self._hash = hash(("biconditional", hash(left), hash(right)))
+        self._symbols = left.symbols() | right.symbols()
 
     def __eq__(self, other):
-        return (isinstance(other, Biconditional)
-                and self.left == other.left
-                and self.right == other.right)
+        return self is other or (
+            isinstance(other, Biconditional)
+            and self._hash == other._hash
+            and self.left == other.left
+            and self.right == other.right
+        )
 
     def __hash__(self):
-        return hash(("biconditional", hash(self.left), hash(self.right)))
+        return self._hash
 
     def __repr__(self):
         return f"Biconditional({self.left}, {self.right})"
 
+    def __reduce__(self):
+        return (Biconditional, (self.left, self.right))
+
     def evaluate(self, model):
         return ((self.left.evaluate(model)
                  and self.right.evaluate(model))
                 or (not self.left.evaluate(model)
                     and not self.right.evaluate(model)))
 
+    def evaluate_partial(self, model):
+        left = self.left.evaluate_partial(model)
+        if left is None:
+            return None
+        right = self.right.evaluate_partial(model)
+        if right is None:
+            return None
+        return left == right
+
     def formula(self):
         left = Sentence.parenthesize(str(self.left))
         right = Sentence.parenthesize(str(self.right))
         return f"{left} <=> {right}"
 
     def symbols(self):
-        return set.union(self.left.symbols(), self.right.symbols())
+        return self._symbols
 
 
-def model_check(knowledge, query):
-    """Checks if knowledge base entails query."""
+def model_check(knowledge, query, stats=None, processes=None):
+    """
+    Checks if knowledge base entails query.
 
-    def check_all(knowledge, query, symbols, model):
-        """Checks if knowledge base entails query, given a particular model."""
-
-        # If model has an assignment for each symbol
-        if not symbols:
-
-            # If knowledge base is true in model, then query must also be true
-            if knowledge.evaluate(model):
-                return query.evaluate(model)
-            return True
-        else:
+    If `stats` is a dict, the number of partial models visited and of
+    branches pruned early are added to its "visited" and "pruned" keys.
 
-            # Choose one of the remaining unused symbols
-            remaining = symbols.copy()
-            p = remaining.pop()
+    If `processes` is greater than 1, the first few symbols are fixed to
+    split the models into sub-cubes that are checked in that many worker
+    processes, and all workers stop as soon as one finds a counter-model.
+    """
+    if stats is None:
+        stats = dict()
+    stats.setdefault("visited", 0)
+    stats.setdefault("pruned", 0)
 
-            # Create a model where the symbol is true
-            model_true = model.copy()
-            model_true[p] = True
+    # Get all symbols in both knowledge and query
+    symbols = sorted(knowledge.symbols() | query.symbols())
 
-            # Create a model where the symbol is false
-            model_false = model.copy()
-            model_false[p] = False
+    # Check that knowledge entails query
+    if processes is not None and processes > 1 and symbols:
+        return parallel_check(knowledge, query, symbols, stats, processes)
+    return check_all(knowledge, query, symbols, dict(), stats)
+
+
+def check_all(knowledge, query, symbols, model, stats, stop=None):
+    """
+    Checks if knowledge base entails query in every extension of `model`
+    that assigns the given symbols.
+
+    The search is a depth-first walk over one mutable model: symbols are
+    assigned True, then flipped to False, then removed again on the way
+    back up, so no model is ever copied and depth is not limited by
+    Python's recursion limit.
+
+    If `stop` is an event, it is polled periodically and the search gives
+    up, returning None, once it is set.
+    """
+    depth = 0
+    while True:
+        stats["visited"] += 1
+        if stop is not None and stats["visited"] % 1024 == 0:
+            if stop.is_set():
+                return None
+
+        # If knowledge base is already false, no model in this branch counts
+        # If query is already true, it holds in every model in this branch
+        # If knowledge base is true and query false, this is a counter-model
+        kb = knowledge.evaluate_partial(model)
+        value = None if kb is False else query.evaluate_partial(model)
+        if kb is True and value is False:
+            if depth < len(symbols):
+                stats["pruned"] += 1
+            return False
+        decided = kb is False or value is True
+
+        if not decided:
+
+            # Choose the next unused symbol and try it as true first
+            model[symbols[depth]] = True
+            depth += 1
+            continue
+
+        if depth < len(symbols):
+            stats["pruned"] += 1
+
+        # Backtrack to the deepest symbol still to be tried as false
+        while depth > 0:
+            p = symbols[depth - 1]
+            if model[p]:
+                model[p] = False
+                break
+            del model[p]
+            depth -= 1
+        else:
+            # Entailment holds in every model
+            return True
 
-            # Ensure entailment holds in both models
-            return (check_all(knowledge, query, remaining, model_true) and
-                    check_all(knowledge, query, remaining, model_false))
 
-    # Get all symbols in both knowledge and query
-    symbols = set.union(knowledge.symbols(), query.symbols())
+# Event shared by the workers of parallel_check, set to stop them all
+_stop = None
+
+
+def _init_worker(stop):
+    global _stop
+    _stop = stop
+
+
+def _check_cube(knowledge, query, symbols, prefix):
+    """Runs check_all in a worker, with the first symbols fixed by prefix."""
+    stats = dict(visited=0, pruned=0)
+    result = check_all(knowledge, query, symbols, prefix, stats, _stop)
+    if result is False:
+        _stop.set()
+    return result, stats
+
+
+def parallel_check(knowledge, query, symbols, stats, processes):
+    """
+    Checks if knowledge base entails query by fixing the first k symbols
+    and checking each of the 2^k sub-cubes in a pool of worker processes.
+    """
+
+    # Use a few cubes per worker so that uneven cubes balance out
+    k = min(len(symbols), (4 * processes - 1).bit_length())
+    fixed, free = symbols[:k], symbols[k:]
+
+    stop = multiprocessing.Event()
+    result = True
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=processes, initializer=_init_worker, initargs=(stop,)
+    ) as executor:
+        futures = [
+            executor.submit(_check_cube, knowledge, query, free,
+                            dict(zip(fixed, values)))
+            for values in itertools.product((True, False), repeat=k)
+        ]
+        for future in concurrent.futures.as_completed(futures):
+            if future.cancelled():
+                continue
+            cube_result, cube_stats = future.result()
+            stats["visited"] += cube_stats["visited"]
+            stats["pruned"] += cube_stats["pruned"]
+
+            # A counter-model in any cube settles the question
+            if cube_result is False:
+                result = False
+                stop.set()
+                for other in futures:
+                    other.cancel()
+    return result
+
+
+def model_check_many(knowledge, queries, stats=None):
+    """
+    Checks several queries against one knowledge base, searching the
+    models of the knowledge base only once.
+
+    Returns a dict mapping each query to True if the knowledge base
+    entails it, False if the knowledge base entails its negation, and
+    None if neither is entailed. If `stats` is a dict, the number of
+    partial models visited and of branches pruned early are added to its
+    "visited" and "pruned" keys.
+    """
+    if stats is None:
+        stats = dict()
+    stats.setdefault("visited", 0)
+    stats.setdefault("pruned", 0)
+    queries = list(queries)
+
+    # Get all symbols in the knowledge base and in every query
+    symbols = sorted(knowledge.symbols().union(
+        *[query.symbols() for query in queries]
+    ))
+
+    # Track, per query, whether it held / failed in some model of the KB
+    seen_true = set()
+    seen_false = set()
+    undecided = set(queries)
+
+    # Walk partial models depth first, as check_all does, so that a
+    # branch is cut as soon as the knowledge base is false in it, or once
+    # the knowledge base is true and every open query is settled in it
+    model = dict()
+    depth = 0
+    while undecided:
+        stats["visited"] += 1
+
+        kb = knowledge.evaluate_partial(model)
+        decided = kb is False
+        if kb is True:
+            decided = True
+            for query in list(undecided):
+                value = query.evaluate_partial(model)
+                if value is None:
+                    decided = False
+                    continue
+                (seen_true if value else seen_false).add(query)
+                if query in seen_true and query in seen_false:
+                    undecided.remove(query)
+
+        if not decided and undecided:
+
+            # Choose the next unused symbol and try it as true first
+            model[symbols[depth]] = True
+            depth += 1
+            continue
+
+        if depth < len(symbols):
+            stats["pruned"] += 1
+
+        # Backtrack to the deepest symbol still to be tried as false
+        while depth > 0:
+            p = symbols[depth - 1]
+            if model[p]:
+                model[p] = False
+                break
+            del model[p]
+            depth -= 1
+        else:
+            # Every model has been visited
+            break
+
+    result = dict()
+    for query in queries:
+        if query not in seen_false:
+            result[query] = True
+        elif query not in seen_true:
+            result[query] = False
+        else:
+            result[query] = None
+    return result
+
+
+class BDD():
+    """
+    Reduced ordered binary decision diagrams over the symbols of logical
+    sentences.
+
+    Nodes are integers: 0 and 1 are the false and true terminals, and
+    every other node is an index into self.nodes, which holds a
+    (level, low, high) triple. Nodes are hash-consed through a unique
+    table, so equal functions are always the same node, and results of
+    apply are memoized in an operation cache.
+    """
+
+    FALSE = 0
+    TRUE = 1
+
+    def __init__(self, order=()):
+
+        # Variable order: symbol names by level, and levels by name
+        self.order = []
+        self.levels = dict()
+
+        # Node table, with placeholders for the two terminals
+        self.nodes = [None, None]
+
+        # Unique table, operation cache, and compiled sentences
+        self.unique = dict()
+        self.cache = dict()
+        self.compiled = dict()
+
+        for name in order:
+            self.variable(name)
+
+    def variable(self, name):
+        """Returns the node for a symbol, adding it to the order if new."""
+        if name not in self.levels:
+            self.levels[name] = len(self.order)
+            self.order.append(name)
+        return self.node(self.levels[name], BDD.FALSE, BDD.TRUE)
+
+    def level(self, u):
+        """Returns the level of a node; terminals sit below every variable."""
+        if u <= BDD.TRUE:
+            return len(self.order)
+        return self.nodes[u][0]
+
+    def node(self, level, low, high):
+        """Returns the unique node for (level, low, high)."""
+        if low == high:
+            return low
+        key = (level, low, high)
+        u = self.unique.get(key)
+        if u is None:
+            u = len(self.nodes)
+            self.nodes.append(key)
+            self.unique[key] = u
+        return u
+
+    def negate(self, u):
+        """Returns the node for the negation of u."""
+
+        # Walk the diagram with an explicit stack, so depth is not
+        # limited by Python's recursion limit: a node is visited once to
+        # queue its children, then again to build its negation from
+        # theirs, which are on top of the results stack by then
+        results = []
+        stack = [(u, False)]
+        while stack:
+            u, ready = stack.pop()
+            if u <= BDD.TRUE:
+                results.append(1 - u)
+                continue
+            key = ("not", u)
+            level, low, high = self.nodes[u]
+            if ready:
+                high = results.pop()
+                low = results.pop()
+                result = self.node(level, low, high)
+                self.cache[key] = result
+                results.append(result)
+                continue
+            result = self.cache.get(key)
+            if result is not None:
+                results.append(result)
+                continue
+            stack.append((u, True))
+            stack.append((high, False))
+            stack.append((low, False))
+        return results[0]
+
+    def terminal(self, op, u, v):
+        """
+        Returns the result of combining u and v with op if it follows
+        without expanding either node, or None.
+        """
+        if op == "and":
+            if u == BDD.FALSE or v == BDD.FALSE:
+                return BDD.FALSE
+            if u == BDD.TRUE or u == v:
+                return v
+            if v == BDD.TRUE:
+                return u
+        elif op == "or":
+            if u == BDD.TRUE or v == BDD.TRUE:
+                return BDD.TRUE
+            if u == BDD.FALSE or u == v:
+                return v
+            if v == BDD.FALSE:
+                return u
+        elif op == "xor":
+            if u == v:
+                return BDD.FALSE
+            if u == BDD.FALSE:
+                return v
+            if v == BDD.FALSE:
+                return u
+            if u == BDD.TRUE:
+                return self.negate(v)
+            if v == BDD.TRUE:
+                return self.negate(u)
+        else:
+            raise ValueError(f"unknown operation {op}")
+        return None
+
+    def apply(self, op, u, v):
+        """Combines two nodes with "and", "or" or "xor"."""
+
+        # Shannon expansion on the topmost variable of u and v, walked
+        # with an explicit stack as in negate: a pair is visited once to
+        # queue its cofactor pairs, then again (with its level) to build
+        # its node from their results
+        results = []
+        stack = [(u, v, None)]
+        while stack:
+            u, v, level = stack.pop()
+            if level is not None:
+                high = results.pop()
+                low = results.pop()
+                result = self.node(level, low, high)
+                self.cache[(op, u, v)] = result
+                results.append(result)
+                continue
+
+            result = self.terminal(op, u, v)
+            if result is None:
+
+                # All three operations are commutative
+                if u > v:
+                    u, v = v, u
+                result = self.cache.get((op, u, v))
+            if result is not None:
+                results.append(result)
+                continue
+
+            level = min(self.level(u), self.level(v))
+            u_low, u_high = self.cofactors(u, level)
+            v_low, v_high = self.cofactors(v, level)
+            stack.append((u, v, level))
+            stack.append((u_high, v_high, None))
+            stack.append((u_low, v_low, None))
+        return results[0]
+
+    def cofactors(self, u, level):
+        """Returns the (low, high) cofactors of u with respect to level."""
+        if self.level(u) != level:
+            return u, u
+        _, low, high = self.nodes[u]
+        return low, high
+
+    def compile(self, sentence):
+        """Returns the node for a logical sentence."""
+        if isinstance(sentence, int):
+            return sentence
+        result = self.compiled.get(sentence)
+        if result is not None:
+            return result
+        if not isinstance(sentence, Sentence):
+            raise TypeError("must be a logical sentence")
 
-    # Check that knowledge entails query
-    return check_all(knowledge, query, symbols, dict())
+        # Give new symbols levels in a deterministic order
+        for name in sorted(sentence.symbols()):
+            if name not in self.levels:
+                self.variable(name)
+
+        # Compile subsentences before the sentences that use them, with
+        # an explicit stack rather than recursion
+        root = sentence
+        stack = [(sentence, False)]
+        while stack:
+            sentence, ready = stack.pop()
+            if sentence in self.compiled:
+                continue
+            parts = self.parts(sentence)
+            if not ready:
+                stack.append((sentence, True))
+                stack.extend((part, False) for part in parts)
+                continue
+            compiled = [self.compiled[part] for part in parts]
+
+            if isinstance(sentence, Symbol):
+                result = self.variable(sentence.name)
+            elif isinstance(sentence, Not):
+                result = self.negate(compiled[0])
+            elif isinstance(sentence, And):
+                result = BDD.TRUE
+                for conjunct in self.bottom_up(compiled):
+                    result = self.apply("and", conjunct, result)
+            elif isinstance(sentence, Or):
+                result = BDD.FALSE
+                for disjunct in self.bottom_up(compiled):
+                    result = self.apply("or", disjunct, result)
+            elif isinstance(sentence, Implication):
+                result = self.apply("or", self.negate(compiled[0]),
+                                    compiled[1])
+            else:
+                result = self.negate(self.apply("xor", *compiled))
+
+            # A conjunction changed by And.add hashes differently
+            # afterwards, so a stale entry is never returned for it
+            self.compiled[sentence] = result
+
+        return self.compiled[root]
+
+    def bottom_up(self, nodes):
+        """
+        Returns nodes ordered from the deepest top variable up. Folding
+        an n-ary And or Or in this order puts each new operand above the
+        result so far, so a chain of symbols is built one node at a time
+        rather than copied at every step.
+        """
+        return sorted(nodes, key=self.level, reverse=True)
+
+    @staticmethod
+    def parts(sentence):
+        """Returns the immediate subsentences of a sentence."""
+        if isinstance(sentence, Symbol):
+            return []
+        elif isinstance(sentence, Not):
+            return [sentence.operand]
+        elif isinstance(sentence, And):
+            return sentence.conjuncts
+        elif isinstance(sentence, Or):
+            return sentence.disjuncts
+        elif isinstance(sentence, Implication):
+            return [sentence.antecedent, sentence.consequent]
+        elif isinstance(sentence, Biconditional):
+            return [sentence.left, sentence.right]
+        raise TypeError("must be a logical sentence")
+
+    def entails(self, knowledge, query):
+        """
+        Checks if knowledge entails query; both may be sentences or nodes.
+        """
+        knowledge = self.compile(knowledge)
+        query = self.compile(query)
+        return self.apply("and", knowledge, self.negate(query)) == BDD.FALSE
+
+    def count(self, u):
+        """Returns the number of models of u over every variable in order."""
+        u = self.compile(u)
+
+        # Find every node below u; a node's children are always created
+        # before it, so counting in order of index counts children first
+        reachable = set()
+        stack = [u]
+        while stack:
+            node = stack.pop()
+            if node <= BDD.TRUE or node in reachable:
+                continue
+            reachable.add(node)
+            stack.extend(self.nodes[node][1:])
+
+        # Count models over the variables from each node's level down
+        counts = {BDD.FALSE: 0, BDD.TRUE: 1}
+        for node in sorted(reachable):
+            level, low, high = self.nodes[node]
+            counts[node] = (
+                counts[low] * 2 ** (self.level(low) - level - 1)
+                + counts[high] * 2 ** (self.level(high) - level - 1)
+            )
+
+        return counts[u] * 2 ** self.level(u)
+
+    def models(self, u):
+        """Yields every model of u as a dict over every variable in order."""
+        u = self.compile(u)
+        if u == BDD.FALSE:
+            return
+
+        # Depth-first over levels with an explicit stack; each entry sets
+        # the value of the level above it, and entries deeper down only
+        # overwrite values below that, so `values` always holds the path
+        # to the entry being expanded
+        values = [None] * len(self.order)
+        stack = [(0, u, None)]
+        while stack:
+            level, u, value = stack.pop()
+            if level > 0:
+                values[level - 1] = value
+            if level == len(self.order):
+                if u == BDD.TRUE:
+                    yield dict(zip(self.order, values))
+                continue
+            low, high = self.cofactors(u, level)
+            for value, child in ((True, high), (False, low)):
+                if child != BDD.FALSE:
+                    stack.append((level + 1, child, value))
+
+
+def to_cnf(sentence, positive=True):
+    """
+    Returns the clauses of the conjunctive normal form of a sentence,
+    or of its negation if `positive` is False.
+
+    Each clause is a frozenset of literals, and each literal is a
+    (symbol name, polarity) pair. Tautological clauses are dropped.
+    """
+    if isinstance(sentence, Symbol):
+        return {frozenset([(sentence.name, positive)])}
+    if isinstance(sentence, Not):
+        return to_cnf(sentence.operand, not positive)
+    if isinstance(sentence, And):
+        parts = [to_cnf(conjunct, positive)
+                 for conjunct in sentence.conjuncts]
+        return _conjoin(parts) if positive else _disjoin(parts)
+    if isinstance(sentence, Or):
+        parts = [to_cnf(disjunct, positive)
+                 for disjunct in sentence.disjuncts]
+        return _disjoin(parts) if positive else _conjoin(parts)
+    if isinstance(sentence, Implication):
+        if positive:
+            return _disjoin([to_cnf(sentence.antecedent, False),
+                             to_cnf(sentence.consequent, True)])
+        return _conjoin([to_cnf(sentence.antecedent, True),
+                         to_cnf(sentence.consequent, False)])
+    if isinstance(sentence, Biconditional):
+        left, right = sentence.left, sentence.right
+        return _conjoin([
+            _disjoin([to_cnf(left, False), to_cnf(right, positive)]),
+            _disjoin([to_cnf(left, True), to_cnf(right, not positive)])
+        ])
+    raise TypeError("must be a logical sentence")
+
+
+def _conjoin(parts):
+    """Returns the clauses of a conjunction of CNF clause sets."""
+    return set().union(*parts)
+
+
+def _disjoin(parts):
+    """Returns the clauses of a disjunction of CNF clause sets."""
+    clauses = {frozenset()}
+    for part in parts:
+        clauses = {
+            a | b for a in clauses for b in part
+            if not _tautology(a | b)
+        }
+    return clauses
+
+
+def _tautology(clause):
+    return any((name, not polarity) in clause for name, polarity in clause)
+
+
+class ClauseIndex():
+    """
+    A set of clauses indexed by literal, so that resolution partners and
+    subsumption candidates are found without scanning every clause.
+    """
+
+    def __init__(self):
+        self.clauses = set()
+        self.index = dict()
+
+    def __contains__(self, clause):
+        return clause in self.clauses
+
+    def __len__(self):
+        return len(self.clauses)
+
+    def add(self, clause):
+        self.clauses.add(clause)
+        for literal in clause:
+            self.index.setdefault(literal, set()).add(clause)
+
+    def remove(self, clause):
+        self.clauses.discard(clause)
+        for literal in clause:
+            self.index.get(literal, set()).discard(clause)
+
+    def containing(self, literal):
+        """Returns the clauses that contain a literal."""
+        return self.index.get(literal, set())
+
+    def subsumes(self, clause):
+        """Checks if some stored clause is a subset of clause."""
+        if frozenset() in self.clauses:
+            return True
+        hits = dict()
+        for literal in clause:
+            for other in self.containing(literal):
+                hits[other] = hits.get(other, 0) + 1
+                if hits[other] == len(other):
+                    return True
+        return False
+
+    def subsumed_by(self, clause):
+        """Returns the stored clauses that are supersets of clause."""
+        if not clause:
+            return set(self.clauses)
+        literals = sorted(clause, key=lambda l: len(self.containing(l)))
+        result = set(self.containing(literals[0]))
+        for literal in literals[1:]:
+            result &= self.containing(literal)
+            if not result:
+                break
+        return result
+
+
+Resolution = collections.namedtuple(
+    "Resolution", ["entailed", "proof_size", "generated"]
+)
+
+
+def resolution_check(knowledge, query, set_of_support=True):
+    """
+    Checks if knowledge base entails query by refuting the clauses of
+    knowledge ∧ ¬query with resolution.
+
+    Clauses are picked shortest first (unit preference). With a set of
+    support, only clauses descended from ¬query are resolved against the
+    rest; if that saturates without a proof, the search is repeated
+    without it, which keeps it complete for inconsistent knowledge.
+    Redundant clauses are removed by forward and backward subsumption.
+
+    Returns a Resolution with the verdict, the number of clauses in the
+    refutation (0 if none was found), and the clauses generated.
+    """
+    kb_clauses = to_cnf(knowledge)
+    query_clauses = to_cnf(query, False)
+
+    if set_of_support:
+        entailed, proof_size, generated = _saturate(kb_clauses, query_clauses)
+        if entailed:
+            return Resolution(entailed, proof_size, generated)
+    else:
+        generated = 0
+    entailed, proof_size, more = _saturate(set(), kb_clauses | query_clauses)
+    return Resolution(entailed, proof_size, generated + more)
+
+
+def _saturate(usable_clauses, support_clauses):
+    """
+    Runs the given-clause loop, resolving each clause picked from the
+    set of support against the usable clauses.
+
+    Returns (refuted, proof size, clauses generated).
+    """
+    kept = ClauseIndex()
+    usable = ClauseIndex()
+    support = []
+    parents = dict()
+    generated = 0
+    counter = itertools.count()
+
+    def keep(clause, origin):
+        """Adds clause unless subsumed, removing clauses it subsumes."""
+        if kept.subsumes(clause):
+            return False
+        for other in kept.subsumed_by(clause):
+            kept.remove(other)
+            usable.remove(other)
+        kept.add(clause)
+        parents[clause] = origin
+        return True
+
+    def proof_size(clause):
+        """Counts the clauses in the derivation of clause."""
+        seen = set()
+        stack = [clause]
+        while stack:
+            clause = stack.pop()
+            if clause in seen:
+                continue
+            seen.add(clause)
+            if parents.get(clause):
+                stack.extend(parents[clause])
+        return len(seen)
+
+    for clause in usable_clauses:
+        if keep(clause, None):
+            usable.add(clause)
+    for clause in support_clauses:
+        if keep(clause, None):
+            heapq.heappush(support, (len(clause), next(counter), clause))
+    if frozenset() in kept:
+        return True, 1, generated
+
+    while support:
+        _, _, given = heapq.heappop(support)
+
+        # Skip clauses removed by backward subsumption since being queued
+        if given not in kept or given in usable:
+            continue
+
+        # Resolve the given clause against every usable clause that
+        # contains a complementary literal
+        for name, polarity in given:
+            partners = list(usable.containing((name, not polarity)))
+            for partner in partners:
+                if partner not in usable:
+                    continue
+                resolvent = ((given - {(name, polarity)})
+                             | (partner - {(name, not polarity)}))
+                if _tautology(resolvent):
+                    continue
+                generated += 1
+                if not keep(resolvent, (given, partner)):
+                    continue
+                if not resolvent:
+                    return True, proof_size(resolvent), generated
+                heapq.heappush(support,
+                               (len(resolvent), next(counter), resolvent))
+            if given not in kept:
+                break
+
+        if given in kept:
+            usable.add(given)
+
+    return False, 0, generated
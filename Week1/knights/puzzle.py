@@ -86,8 +86,9 @@ def main():
         if len(knowledge.conjuncts) == 0:
             print("    Not yet implemented.")
         else:
+            entailed = model_check_many(knowledge, symbols)
             for symbol in symbols:
-                if model_check(knowledge, symbol):
+                if entailed[symbol]:
                     print(f"    {symbol}")
 
 
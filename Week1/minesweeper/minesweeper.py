@@ -1,5 +1,39 @@
+import collections
+import fractions
+import functools
 import itertools
+import json
+import math
 import random
+import time
+
+# Seconds the AI may spend working out the safest guess
+GUESS_BUDGET = 0.25
+
+# Largest frontier component that is counted exactly rather than sampled
+EXACT_LIMIT = 48
+
+
+# Offsets from a cell to each of its eight neighbors
+NEIGHBOR_OFFSETS = [
+    (di, dj)
+    for di in (-1, 0, 1)
+    for dj in (-1, 0, 1)
+    if (di, dj) != (0, 0)
+]
+
+
+def neighbors(cell, height, width):
+    """
+    Returns the cells within one row and column of a given cell that
+    are on a height x width board, not including the cell itself.
+    """
+    i, j = cell
+    return [
+        (i + di, j + dj)
+        for di, dj in NEIGHBOR_OFFSETS
+        if 0 <= i + di < height and 0 <= j + dj < width
+    ]
 
 
 class Minesweeper():
@@ -14,21 +48,19 @@ class Minesweeper():
         self.width = width
         self.mines = set()
 
-        # Initialize an empty field with no mines
-        self.board = []
-        for i in range(self.height):
-            row = []
-            for j in range(self.width):
-                row.append(False)
-            self.board.append(row)
+        # The board is stored flat, with cell (i, j) at i * width + j:
+        # one byte per cell saying if it is a mine, and one holding
+        # the number of mines next to it
+        self.board = bytearray(height * width)
+        self.counts = bytearray(height * width)
 
-        # Add mines randomly
-        while len(self.mines) != mines:
-            i = random.randrange(height)
-            j = random.randrange(width)
-            if not self.board[i][j]:
-                self.mines.add((i, j))
-                self.board[i][j] = True
+        # Add mines randomly, drawing distinct cells directly
+        for index in random.sample(range(height * width), mines):
+            cell = divmod(index, width)
+            self.mines.add(cell)
+            self.board[index] = 1
+            for i, j in neighbors(cell, height, width):
+                self.counts[i * width + j] += 1
 
         # At first, player has found no mines
         self.mines_found = set()
@@ -41,7 +73,7 @@ class Minesweeper():
         for i in range(self.height):
             print("--" * self.width + "-")
             for j in range(self.width):
-                if self.board[i][j]:
+                if self.board[i * self.width + j]:
                     print("|X", end="")
                 else:
                     print("| ", end="")
@@ -50,7 +82,7 @@ class Minesweeper():
 
     def is_mine(self, cell):
         i, j = cell
-        return self.board[i][j]
+        return bool(self.board[i * self.width + j])
 
     def nearby_mines(self, cell):
         """
@@ -58,24 +90,8 @@ class Minesweeper():
         within one row and column of a given cell,
         not including the cell itself.
         """
-
-        # Keep count of nearby mines
-        count = 0
-
-        # Loop over all cells within one row and column
-        for i in range(cell[0] - 1, cell[0] + 2):
-            for j in range(cell[1] - 1, cell[1] + 2):
-
-                # Ignore the cell itself
-                if (i, j) == cell:
-                    continue
-
-                # Update count if cell in bounds and is mine
-                if 0 <= i < self.height and 0 <= j < self.width:
-                    if self.board[i][j]:
-                        count += 1
-
-        return count
+        i, j = cell
+        return self.counts[i * self.width + j]
 
     def won(self):
         """
@@ -101,12 +117,18 @@ class Sentence():
     def __str__(self):
         return f"{self.cells} = {self.count}"
 
+    def key(self):
+        """
+        Returns a hashable value that is equal for equal sentences.
+        """
+        return (frozenset(self.cells), self.count)
+
     def known_mines(self):
         """
         Returns the set of all cells in self.cells known to be mines.
         """
         if self.count == len(self.cells) and self.count != 0:
-            return self.cells
+            return set(self.cells)
         
         return set()
 
@@ -115,7 +137,7 @@ class Sentence():
         Returns the set of all cells in self.cells known to be safe.
         """
         if self.count == 0:
-            return self.cells
+            return set(self.cells)
 
         return set()
 
@@ -127,15 +149,8 @@ class Sentence():
         if cell not in self.cells:
             return
 
-        updated = set()
-
-        for acell in self.cells:
-            if acell == cell:
-                continue
-            updated.add(acell)
-
-        self.cells = updated
-        if len(updated) == 0:
+        self.cells.remove(cell)
+        if len(self.cells) == 0:
             self.count = 0
         else:
             self.count -= 1
@@ -150,26 +165,643 @@ class Sentence():
         if cell not in self.cells:
             return
 
-        updated = set()
+        self.cells.remove(cell)
+        return
+
+class MaskSentence():
+    """
+    Logical statement about a Minesweeper game, with its cells stored
+    as the set bits of an integer: cell (i, j) is bit i * width + j,
+    less `offset`. The offset is always the lowest cell in the sentence,
+    so masks stay a few rows wide wherever they are on the board, and
+    subset tests and differences are single integer operations.
+    """
+
+    def __init__(self, cells, count, offset=0):
+        self.cells = cells
+        self.count = count
+        self.offset = offset
+        self.normalize()
+
+    def __eq__(self, other):
+        return self.key() == other.key()
+
+    def __str__(self):
+        return f"{bin(self.cells)} << {self.offset} = {self.count}"
+
+    def normalize(self):
+        """
+        Shifts the mask down so that its lowest set bit is bit 0.
+        """
+        if self.cells:
+            low = (self.cells & -self.cells).bit_length() - 1
+            self.cells >>= low
+            self.offset += low
+        else:
+            self.offset = 0
+
+    def key(self):
+        """
+        Returns a hashable value that is equal for equal sentences.
+        """
+        return (self.offset, self.cells, self.count)
+
+    def cell_bits(self):
+        """
+        Returns the board bit of every cell in the sentence.
+        """
+        offset = self.offset
+        return [offset + bit for bit in mask_bits(self.cells)]
+
+    def known_mines(self):
+        """
+        Returns the board bits of all cells known to be mines.
+        """
+        if self.count == self.cells.bit_count() and self.count != 0:
+            return self.cell_bits()
+
+        return []
+
+    def known_safes(self):
+        """
+        Returns the board bits of all cells known to be safe.
+        """
+        if self.count == 0:
+            return self.cell_bits()
+
+        return []
+
+    def mark_mine(self, bit):
+        """
+        Updates the sentence given that the cell at board bit `bit`
+        is a mine.
+        """
+        bit -= self.offset
+        if bit >= 0 and self.cells >> bit & 1:
+            self.cells ^= 1 << bit
+            self.count -= 1
+            if bit == 0:
+                self.normalize()
+        if self.cells == 0:
+            self.count = 0
+
+    def mark_safe(self, bit):
+        """
+        Updates the sentence given that the cell at board bit `bit`
+        is safe.
+        """
+        bit -= self.offset
+        if bit >= 0 and self.cells >> bit & 1:
+            self.cells ^= 1 << bit
+            if bit == 0:
+                self.normalize()
+
+    def issubset(self, other):
+        # Neither mask has cells below its offset, so self cannot fit in
+        # other if it starts lower
+        shift = self.offset - other.offset
+        if shift < 0:
+            return False
+        return (self.cells << shift) & ~other.cells == 0
+
+    def difference(self, other):
+        """
+        Returns the sentence for the cells of self that are not in other,
+        given that other's cells are a subset of self's.
+        """
+        shift = other.offset - self.offset
+        return MaskSentence(self.cells & ~(other.cells << shift),
+                            self.count - other.count, self.offset)
+
+
+def bits(mask):
+    """
+    Yields the index of each set bit in mask, lowest first.
+    """
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+@functools.lru_cache(maxsize=65536)
+def mask_bits(mask):
+    """
+    Returns the indexes of the set bits in mask as a tuple. Sentences
+    are stored shifted down to their lowest cell, so the same few masks
+    come up again and again.
+    """
+    return tuple(bits(mask))
+
+
+class _OutOfTime(Exception):
+    pass
+
+
+def frontier_components(constraints):
+    """
+    Splits constraints, given as (cells, count) pairs, into groups that
+    share no cells, and returns a list of (cells, constraints) pairs.
+    """
+    parent = dict()
+
+    def find(cell):
+        while parent[cell] != cell:
+            parent[cell] = parent[parent[cell]]
+            cell = parent[cell]
+        return cell
+
+    for cells, count in constraints:
+        cells = list(cells)
+        for cell in cells:
+            parent.setdefault(cell, cell)
+        for cell in cells[1:]:
+            parent[find(cell)] = find(cells[0])
+
+    groups = dict()
+    for cells, count in constraints:
+        if not cells:
+            continue
+        root = find(next(iter(cells)))
+        group = groups.setdefault(root, (set(), []))
+        group[0].update(cells)
+        group[1].append((cells, count))
+    return list(groups.values())
+
+
+def count_solutions(cells, constraints, deadline):
+    """
+    Counts the mine assignments to `cells` (a list) that satisfy every
+    constraint, by backtracking over the cells in order and memoizing on
+    the counts still owed by each constraint.
+
+    Returns a dict mapping a number of mines m to (ways, per-cell ways),
+    where per-cell ways lists how many of the m-mine solutions put a mine
+    on each cell. Raises _OutOfTime once `deadline` has passed.
+    """
+    position = {cell: k for k, cell in enumerate(cells)}
+    n = len(cells)
+
+    # Constraints touching each cell, and cells left in each constraint
+    # after a given position
+    touching = [[] for _ in range(n)]
+    counts = []
+    for c, (members, count) in enumerate(constraints):
+        members = sorted(position[cell] for cell in members)
+        for k in members:
+            touching[k].append((c, len(members) - members.index(k) - 1))
+        counts.append(count)
+
+    memo = dict()
+
+    def solve(k, owed):
+        if k == n:
+            return {0: (1, [])}
+        key = (k, owed)
+        if key in memo:
+            return memo[key]
+        if time.monotonic() > deadline:
+            raise _OutOfTime()
 
-        for acell in self.cells:
-            if acell == cell:
+        result = dict()
+        for value in (0, 1):
+            updated = list(owed)
+            feasible = True
+            for c, after in touching[k]:
+                updated[c] -= value
+                if not 0 <= updated[c] <= after:
+                    feasible = False
+                    break
+            if not feasible:
                 continue
-            updated.add(acell)
+            for m, (ways, per_cell) in solve(k + 1, tuple(updated)).items():
+                entry = result.setdefault(m + value, [0, [0] * (n - k)])
+                entry[0] += ways
+                if value:
+                    entry[1][0] += ways
+                for i, w in enumerate(per_cell):
+                    entry[1][i + 1] += w
+
+        result = {m: (ways, per_cell) for m, (ways, per_cell) in result.items()}
+        memo[key] = result
+        return result
+
+    return solve(0, tuple(counts))
+
+
+def sample_solutions(cells, constraints, deadline, samples=200):
+    """
+    Approximates count_solutions by drawing random solutions with a
+    randomized backtracking search until `samples` are found or the
+    deadline passes. Returns the same format, counting samples as ways.
+    """
+    position = {cell: k for k, cell in enumerate(cells)}
+    n = len(cells)
+    touching = [[] for _ in range(n)]
+    counts = []
+    for c, (members, count) in enumerate(constraints):
+        members = sorted(position[cell] for cell in members)
+        for k in members:
+            touching[k].append((c, len(members) - members.index(k) - 1))
+        counts.append(count)
+
+    def draw():
+        """Returns one random solution as a list of 0/1, or None."""
+        owed = list(counts)
+        values = []
+        stack = [random.sample((0, 1), 2)]
+        while stack:
+            if time.monotonic() > deadline:
+                return None
+            k = len(stack) - 1
+            if len(values) > k:
+                value = values.pop()
+                for c, _ in touching[k]:
+                    owed[c] += value
+            if not stack[-1]:
+                stack.pop()
+                continue
+            value = stack[-1].pop()
+            feasible = True
+            for c, after in touching[k]:
+                if not 0 <= owed[c] - value <= after:
+                    feasible = False
+            if not feasible:
+                continue
+            for c, _ in touching[k]:
+                owed[c] -= value
+            values.append(value)
+            if len(values) == n:
+                return values
+            stack.append(random.sample((0, 1), 2))
+        return None
+
+    result = dict()
+    for _ in range(samples):
+        values = draw()
+        if values is None:
+            break
+        entry = result.setdefault(sum(values), [0, [0] * n])
+        entry[0] += 1
+        for k, value in enumerate(values):
+            entry[1][k] += value
+    return {m: (ways, per_cell) for m, (ways, per_cell) in result.items()}
+
+
+def mine_probabilities(constraints, others, mines_left=None,
+                       budget=GUESS_BUDGET):
+    """
+    Returns the probability that each frontier cell is a mine, and the
+    probability for any of the `others` unknown cells that appear in no
+    constraint.
+
+    The frontier is split into independent components, each of which is
+    counted exactly, or sampled if it is too large or time runs out.
+    With `mines_left` known, a component solution with m mines is
+    weighted by the ways to place the remaining mines on the other cells.
+
+    The whole call stays within `budget` seconds: each component gets an
+    even share of the time left, so time one component does not use
+    passes on to the rest. A component that gets no samples in its share
+    falls back to estimating each cell from the counts of the
+    constraints it is in, and is left out of the mine total weighting.
+    """
+    deadline = time.monotonic() + budget
+    groups = frontier_components(constraints)
+    components = []
+    probabilities = dict()
+    for left, (cells, group) in zip(range(len(groups), 0, -1), groups):
+        cells = sorted(cells)
+        distribution = None
+        if len(cells) <= EXACT_LIMIT:
+            try:
+                distribution = count_solutions(
+                    cells, group, share(deadline, left)
+                )
+            except _OutOfTime:
+                pass
+        if distribution is None:
+            distribution = sample_solutions(
+                cells, group, share(deadline, left)
+            )
+        if distribution:
+            components.append((cells, distribution))
+        else:
+            probabilities.update(constraint_densities(group))
+
+    def convolve(distributions):
+        """
+        Returns total mines -> share of the ways over independent
+        components, each scaled to sum to 1 so the products stay floats.
+        """
+        total = {0: 1.0}
+        for distribution in distributions:
+            scale = sum(ways for ways, _ in distribution.values())
+            combined = dict()
+            for a, x in total.items():
+                for b, (ways, _) in distribution.items():
+                    combined[a + b] = (combined.get(a + b, 0)
+                                       + x * (ways / scale))
+            total = combined
+        return total
+
+    def log_ways(rest):
+        """Log of the ways to place `rest` mines among the other cells."""
+        return (math.lgamma(others + 1) - math.lgamma(rest + 1)
+                - math.lgamma(others - rest + 1))
+
+    # Weights are only compared with each other, so take them relative
+    # to the largest one rather than as exact (and huge) binomials
+    reference = 0
+    if mines_left is not None:
+        frontier = sum(len(cells) for cells, _ in components)
+        low = max(0, mines_left - frontier)
+        high = min(others, mines_left)
+        if low <= high:
+            reference = log_ways(min(max(others // 2, low), high))
+
+    def weight(mines):
+        """Ways to place the remaining mines among the other cells."""
+        if mines_left is None:
+            return 1
+        rest = mines_left - mines
+        if rest < 0 or rest > others:
+            return 0
+        return math.exp(log_ways(rest) - reference)
+
+    for i, (cells, distribution) in enumerate(components):
+        rest = convolve(
+            [d for j, (_, d) in enumerate(components) if j != i]
+        )
+        scale = sum(ways for ways, _ in distribution.values())
+        total = 0
+        mine_ways = [0] * len(cells)
+        for m, (ways, per_cell) in distribution.items():
+            factor = sum(x * weight(m + r)
+                         for r, x in rest.items()) / scale
+            total += ways * factor
+            for k, w in enumerate(per_cell):
+                mine_ways[k] += w * factor
+        for k, cell in enumerate(cells):
+            probabilities[cell] = mine_ways[k] / total if total else 0.5
+
+    # Expected density of the cells outside the frontier
+    if others == 0:
+        other = None
+    elif mines_left is None:
+        other = (sum(probabilities.values()) / len(probabilities)
+                 if probabilities else 0.5)
+    else:
+        totals = convolve([d for _, d in components])
+        total = sum(x * weight(m) for m, x in totals.items())
+        expected = sum(x * weight(m) * (mines_left - m)
+                       for m, x in totals.items())
+        other = expected / total / others if total else 0.5
+    return probabilities, other
+
+
+def share(deadline, parts):
+    """
+    Returns the deadline for one of `parts` pieces of work sharing the
+    time left until `deadline` evenly.
+    """
+    now = time.monotonic()
+    return now + max(0, deadline - now) / parts
+
+
+def constraint_densities(constraints):
+    """
+    Returns a rough mine probability for each cell in the constraints,
+    given as (cells, count) pairs: the mean of count / len(cells) over
+    the constraints that contain the cell.
+    """
+    densities = dict()
+    for cells, count in constraints:
+        for cell in cells:
+            densities.setdefault(cell, []).append(count / len(cells))
+    return {cell: sum(values) / len(values)
+            for cell, values in densities.items()}
+
+
+def linear_deductions(constraints):
+    """
+    Finds cells that are certainly mines or certainly safe by putting
+    the constraints, given as (cells, count) pairs, into reduced row
+    echelon form and checking each row's bounds: with 0/1 unknowns, a
+    row whose right-hand side equals its smallest or largest possible
+    value fixes every cell in it.
+
+    Rows are sparse dicts from cell to coefficient, and a column index
+    keeps elimination to the rows that actually contain the pivot.
+    Returns (mines, safes) as sets of cells.
+    """
+    rows = dict()
+    columns = dict()
+    for r, (cells, count) in enumerate(constraints):
+        if not cells:
+            continue
+        rows[r] = ({cell: fractions.Fraction(1) for cell in cells},
+                   fractions.Fraction(count))
+        for cell in cells:
+            columns.setdefault(cell, set()).add(r)
+
+    # Gauss-Jordan elimination, pivoting on each row's smallest cell
+    for r in list(rows):
+        coefficients, total = rows[r]
+        if not coefficients:
+            continue
+        pivot = min(coefficients)
+        scale = coefficients[pivot]
+        for cell in coefficients:
+            coefficients[cell] /= scale
+        total /= scale
+        rows[r] = (coefficients, total)
+
+        for other in list(columns[pivot]):
+            if other == r:
+                continue
+            other_coefficients, other_total = rows[other]
+            factor = other_coefficients[pivot]
+            for cell, value in coefficients.items():
+                updated = other_coefficients.get(cell, 0) - factor * value
+                if updated:
+                    if cell not in other_coefficients:
+                        columns[cell].add(other)
+                    other_coefficients[cell] = updated
+                elif cell in other_coefficients:
+                    del other_coefficients[cell]
+                    columns[cell].discard(other)
+            rows[other] = (other_coefficients, other_total - factor * total)
+
+    # Bound reasoning on every reduced row
+    mines = set()
+    safes = set()
+    for coefficients, total in rows.values():
+        if not coefficients:
+            continue
+        low = sum(value for value in coefficients.values() if value < 0)
+        high = sum(value for value in coefficients.values() if value > 0)
+        if total == low:
+            for cell, value in coefficients.items():
+                (safes if value > 0 else mines).add(cell)
+        elif total == high:
+            for cell, value in coefficients.items():
+                (mines if value > 0 else safes).add(cell)
+    return mines, safes
+
+
+class CellPool():
+    """
+    The cells of a board that have not been removed, with O(1) removal,
+    membership and uniform random choice.
+
+    Conceptually this is an array of every cell index, where a removed
+    cell is swapped with the last live one and the live length shrinks.
+    Only positions that no longer hold their own index are stored, so
+    memory grows with the number of removals rather than the board size.
+    """
+
+    def __init__(self, height, width):
+        self.width = width
+        self.size = height * width
+
+        # Position -> cell index, and cell index -> position,
+        # for every entry that differs from the identity
+        self.at = dict()
+        self.position = dict()
+
+    def __len__(self):
+        return self.size
+
+    def __contains__(self, cell):
+        i, j = cell
+        index = i * self.width + j
+        return self.position.get(index, index) < self.size
+
+    def discard(self, cell):
+        i, j = cell
+        index = i * self.width + j
+        position = self.position.get(index, index)
+        if position >= self.size:
+            return
+
+        # Swap the cell with the last live one and shrink the pool
+        last = self.size - 1
+        moved = self.at.get(last, last)
+        self.at[position] = moved
+        self.position[moved] = position
+        self.at[last] = index
+        self.position[index] = last
+        self.size -= 1
+
+    def choice(self):
+        """
+        Returns a random cell still in the pool.
+        """
+        position = random.randrange(self.size)
+        return divmod(self.at.get(position, position), self.width)
+
+    def __iter__(self):
+        for position in range(self.size):
+            yield divmod(self.at.get(position, position), self.width)
+
+
+class AIMetrics():
+    """
+    Statistics about the AI's knowledge and inference, updated on every
+    call to add_knowledge, for display or for dumping to a file.
+    """
+
+    def __init__(self):
+        self.moves = 0
+        self.sentences = 0
+        self.safes = 0
+        self.mines = 0
+
+        # Seconds spent in the last add_knowledge call, and in all of them
+        self.inference_time = 0.0
+        self.total_inference_time = 0.0
+
+        # Cells newly found to be safe or mines by the last call, and
+        # by all of them (not counting the cells that were played)
+        self.deductions = 0
+        self.total_deductions = 0
+
+    def record(self, ai, elapsed, deductions):
+        """
+        Updates the metrics after one add_knowledge call on ai.
+        """
+        self.moves = len(ai.moves_made)
+        self.sentences = len(ai.knowledge)
+        self.safes = len(ai.safes)
+        self.mines = len(ai.mines)
+        self.inference_time = elapsed
+        self.total_inference_time += elapsed
+        self.deductions = deductions
+        self.total_deductions += deductions
+
+    def as_dict(self):
+        return dict(vars(self))
+
+    def lines(self):
+        """
+        Returns the metrics as short lines of text for an overlay.
+        """
+        return [
+            f"Sentences: {self.sentences}",
+            f"Safes: {self.safes}  Mines: {self.mines}",
+            f"Deduced: {self.deductions} ({self.total_deductions})",
+            f"Think: {self.inference_time * 1000:.1f} ms",
+        ]
+
+    def dump(self, path):
+        """
+        Writes the metrics to a file as JSON.
+        """
+        with open(path, "w") as f:
+            json.dump(self.as_dict(), f, indent=2)
+
+
+class KnowledgeBase(dict):
+    """
+    Sentences keyed by their key(), so that each one is only stored once.
+    A sentence can be tested for membership as well as a key, after
+    being passed through `convert` if one is given.
+    """
+
+    def __init__(self, convert=None):
+        super().__init__()
+        self.convert = convert
+
+    def __contains__(self, item):
+        if hasattr(item, "key"):
+            if self.convert is not None:
+                item = self.convert(item)
+            item = item.key()
+        return super().__contains__(item)
 
-        self.cells = updated
-        return
 
 class MinesweeperAI():
     """
     Minesweeper game player
     """
 
-    def __init__(self, height=8, width=8):
+    # Values returned by marked()
+    MINE = 1
+    SAFE = 2
 
-        # Set initial height and width
+    def __init__(self, height=8, width=8, mines=None, inference="subset"):
+
+        # Set initial height and width, and the number of mines if known
         self.height = height
         self.width = width
+        self.total_mines = mines
+
+        # "subset" draws inferences from pairs of sentences only;
+        # "linear" also runs Gaussian elimination over all of them
+        if inference not in ["subset", "linear"]:
+            raise ValueError(f"unknown inference mode {inference}")
+        self.inference = inference
 
         # Keep track of which cells have been clicked on
         self.moves_made = set()
@@ -178,26 +810,200 @@ class MinesweeperAI():
         self.mines = set()
         self.safes = set()
 
-        # List of sentences about the game known to be true
-        self.knowledge = []
+        # Candidate moves: safe cells that may not have been played yet
+        # (checked against moves_made when popped), and cells not yet
+        # known to be safe or mines
+        self.safe_moves = []
+        self.undecided = CellPool(height, width)
+
+        # Sentences about the game known to be true, keyed by
+        # Sentence.key() so that each one is only stored once
+        self.knowledge = KnowledgeBase()
+
+        # Index from each cell to the keys of the sentences that contain it
+        self.index = dict()
+
+        # Sentences waiting to be added to the knowledge base by infer()
+        self.pending = collections.deque()
+
+        # Statistics about the knowledge base and inference
+        self.metrics = AIMetrics()
+
+    def add_sentence(self, sentence):
+        """
+        Queues a sentence to be added to the knowledge base
+        the next time inferences are drawn.
+        """
+        self.pending.append(sentence)
+
+    def remove_sentence(self, key):
+        """
+        Removes a sentence from the knowledge base and the index,
+        and returns it.
+        """
+        sentence = self.knowledge.pop(key)
+        for ident in self.cell_ids(sentence):
+            keys = self.index.get(ident)
+            if keys is not None:
+                keys.discard(key)
+        return sentence
 
     def mark_mine(self, cell):
         """
         Marks a cell as a mine, and updates all knowledge
         to mark that cell as a mine as well.
         """
-        self.mines.add(cell)
-        for sentence in self.knowledge:
-            sentence.mark_mine(cell)
+        self.record_mine(cell)
+        self.infer()
 
     def mark_safe(self, cell):
         """
         Marks a cell as safe, and updates all knowledge
         to mark that cell as safe as well.
         """
-        self.safes.add(cell)
-        for sentence in self.knowledge:
-            sentence.mark_safe(cell)
+        self.record_safe(cell)
+        self.infer()
+
+    def record_mine(self, cell):
+        """
+        Records a cell as a mine, and queues the sentences containing it
+        to be updated by the next infer().
+        """
+        self.record(self.cell_id(cell), mine=True)
+
+    def record_safe(self, cell):
+        """
+        Records a cell as safe, and queues the sentences containing it
+        to be updated by the next infer().
+        """
+        self.record(self.cell_id(cell), mine=False)
+
+    def record(self, ident, mine):
+        """
+        Records the cell with id `ident` as a mine (or as safe), and
+        queues the sentences containing it to be updated.
+        """
+        cell = self.cell_at(ident)
+        if mine:
+            self.mines.add(cell)
+            self.undecided.discard(cell)
+        elif cell not in self.safes:
+            self.safes.add(cell)
+            self.undecided.discard(cell)
+            self.safe_moves.append(cell)
+
+        # Sentences change key once updated, so take them out of the
+        # knowledge base and queue them to be added back
+        for key in self.index.pop(ident, set()):
+            sentence = self.remove_sentence(key)
+            if mine:
+                sentence.mark_mine(ident)
+            else:
+                sentence.mark_safe(ident)
+            self.pending.append(sentence)
+
+    # How sentences are stored: cell ids are the cells themselves, and
+    # sentences are Sentences of them. BitmaskMinesweeperAI overrides
+    # these to work on board bits and MaskSentences instead.
+
+    def cell_id(self, cell):
+        """
+        Returns the id that sentences and the index use for a cell.
+        """
+        return cell
+
+    def cell_at(self, ident):
+        """
+        Returns the (i, j) cell with a given id.
+        """
+        return ident
+
+    def cell_ids(self, sentence):
+        """
+        Returns a list of the ids of the cells in a sentence.
+        """
+        return list(sentence.cells)
+
+    def marked(self, ident):
+        """
+        Returns MINE or SAFE if the cell with a given id is known to be
+        one, and 0 otherwise.
+        """
+        if ident in self.mines:
+            return self.MINE
+        if ident in self.safes:
+            return self.SAFE
+        return 0
+
+    def is_subset(self, sentence, other):
+        """
+        Returns whether the cells of sentence are a proper subset of
+        the cells of other.
+        """
+        return sentence.cells < other.cells
+
+    def difference(self, sentence, other):
+        """
+        Returns the sentence for the cells of sentence that are not in
+        other, given that other's cells are a subset of them.
+        """
+        return Sentence(sentence.cells - other.cells,
+                        sentence.count - other.count)
+
+    def infer(self):
+        """
+        Adds pending sentences to the knowledge base until a fixed point:
+        sentences that settle their cells are used to mark them, and each
+        new sentence is only compared with the stored sentences it shares
+        a cell with, queueing the difference whenever one is a subset of
+        the other.
+        """
+        while self.pending:
+            sentence = self.pending.popleft()
+
+            # Cells marked since the sentence was queued are not indexed
+            # under it, so bring it up to date by checking its own cells
+            idents = self.cell_ids(sentence)
+            marked = [ident for ident in idents if self.marked(ident)]
+            for ident in marked:
+                if self.marked(ident) == self.MINE:
+                    sentence.mark_mine(ident)
+                else:
+                    sentence.mark_safe(ident)
+            if marked:
+                idents = self.cell_ids(sentence)
+
+            # Skip empty sentences and ones that are already known
+            if not sentence.cells:
+                continue
+            key = sentence.key()
+            if key in self.knowledge:
+                continue
+
+            # A sentence that settles all its cells is used up by marking
+            mines = sentence.known_mines()
+            safes = sentence.known_safes()
+            if mines or safes:
+                for ident in mines:
+                    self.record(ident, mine=True)
+                for ident in safes:
+                    self.record(ident, mine=False)
+                continue
+
+            # Only sentences sharing a cell can be subsets of each other
+            related = set()
+            for ident in idents:
+                related |= self.index.get(ident, set())
+
+            self.knowledge[key] = sentence
+            for ident in idents:
+                self.index.setdefault(ident, set()).add(key)
+
+            for other in [self.knowledge[key] for key in related]:
+                if self.is_subset(other, sentence):
+                    self.pending.append(self.difference(sentence, other))
+                elif self.is_subset(sentence, other):
+                    self.pending.append(self.difference(other, sentence))
 
     def add_knowledge(self, cell, count):
         """
@@ -214,74 +1020,53 @@ class MinesweeperAI():
             5) add any new sentences to the AI's knowledge base
                if they can be inferred from existing knowledge
         """
+        start = time.perf_counter()
+        known = len(self.safes) + len(self.mines)
+        if cell not in self.safes:
+            # The played cell itself is not a deduction
+            known += 1
+
         # 1)
         self.moves_made.add(cell)
 
         # 2)
-        self.mark_safe(cell)
+        self.record_safe(cell)
 
         # 3)
         # get all the cell w.r.t. to the current cell that are
         # at a difference of 1, height or width - wise with the current cell
         # and are not already marked as a safe or a mine cell
         # add these cells to the knowledge base as a new sentence
-        neighbors = set()
-        for i in range(self.height):
-            for j in range(self.width):
-                if (i, j) in self.safes:
-                    continue
-                if abs(i - cell[0]) == 1 and abs(j - cell[1]) == 0:
-                    neighbors.add((i, j))
-                elif abs(i - cell[0]) == 0 and abs(j - cell[1]) == 1:
-                    neighbors.add((i, j))
-                elif abs(i - cell[0]) == 1 and abs(j - cell[1]) == 1:
-                    neighbors.add((i, j))
-                else:
-                    continue
-        
-        new_sentence = Sentence(neighbors, count)
+        # (known mines are left out and taken off the count instead)
+        unknown = set()
+        for acell in neighbors(cell, self.height, self.width):
+            if acell in self.safes:
+                continue
+            if acell in self.mines:
+                count -= 1
+                continue
+            unknown.add(acell)
+
+        new_sentence = Sentence(unknown, count)
         # print(new_sentence)
-        self.knowledge.append(new_sentence)
+        self.add_sentence(new_sentence)
 
-        # 4.1)
-        # mark cells as safe or mines based on knowledge
-        # if the cell is not already marked as safe or mine
-        # but should be
-        for sentence in self.knowledge:
-            mines = sentence.known_mines()
-            safes = sentence.known_safes()
-            for acell in sentence.cells:
-                if acell in mines:
-                    self.mark_mine(acell)
-                if acell in safes:
-                    self.mark_safe(acell)
-        # 4.2)
-        # Draw new inferences (sentences) from the given KB
-        new_knowledge = []
-        checked = set()
-        for sentence1 in self.knowledge:
-            for sentence2 in self.knowledge:
-                if sentence1.cells == sentence2.cells:
-                    continue
-                # if sentence1 has cells with non-zero no. of mines and
-                # if sentence2 has cells with non-zero no. of mines
-                # sentence1.cells is a subset of sentence2.cells
-                if len(sentence1.cells) == 0 or len(sentence2.cells) == 0:
-                    continue
-                if sentence1.count == 0 or sentence2.count == 0:
-                    continue
-                if sentence1.cells.issubset(sentence2.cells):
-                    new_cells = sentence2.cells - sentence1.cells
-                    new_count = sentence2.count - sentence1.count
-                    new_sentence = Sentence(new_cells, new_count)
-                    new_knowledge.append(new_sentence)
-        
-        for sentence in new_knowledge:
-            self.knowledge.append(sentence)
-        print("no. of sentences, safes, mines")
-        print(len(self.knowledge))
-        print(len(self.safes))
-        print(len(self.mines))
+        # 4) and 5)
+        # mark cells as safe or mines and draw new sentences from the KB,
+        # repeating until nothing more can be concluded
+        self.infer()
+        while self.inference == "linear":
+            mines, safes = linear_deductions(self.constraints())
+            if not mines and not safes:
+                break
+            for acell in mines:
+                self.record_mine(acell)
+            for acell in safes:
+                self.record_safe(acell)
+            self.infer()
+
+        deductions = len(self.safes) + len(self.mines) - known
+        self.metrics.record(self, time.perf_counter() - start, deductions)
 
         return
 
@@ -294,27 +1079,148 @@ class MinesweeperAI():
         This function may use the knowledge in self.mines, self.safes
         and self.moves_made, but should not modify any of those values.
         """
-        for cell in self.safes:
-            if cell not in self.moves_made:
-                return cell
-        
+        # Drop candidates that have been played since they were found
+        while self.safe_moves:
+            if self.safe_moves[-1] not in self.moves_made:
+                return self.safe_moves[-1]
+            self.safe_moves.pop()
+
         return None
 
+    def constraints(self):
+        """
+        Returns the knowledge base as a list of (cells, count) pairs.
+        """
+        return [(sentence.cells, sentence.count)
+                for sentence in self.knowledge.values()]
+
+    def random_other(self, frontier):
+        """
+        Returns a random undecided cell that is not in the frontier.
+        """
+        for _ in range(64):
+            cell = self.undecided.choice()
+            if cell not in frontier:
+                return cell
+
+        # The frontier covers most of the pool, which is then small
+        return random.choice([
+            cell for cell in self.undecided if cell not in frontier
+        ])
+
     def make_random_move(self):
         """
         Returns a move to make on the Minesweeper board.
-        Should choose randomly among cells that:
+        Should choose among cells that:
             1) have not already been chosen, and
             2) are not known to be mines
+        picking the one least likely to be a mine, with ties broken
+        at random.
         """
-        choice = random.Random()
-        while len(self.safes) + len(self.mines) < self.height * self.width:
-            i = choice.randint(0, self.height - 1)
-            j = choice.randint(0, self.width - 1)
-            if (i, j) in self.moves_made:
-                continue
-            if (i, j) in self.mines:
-                continue
-            return (i, j)
+        # A known safe cell carries no risk at all
+        move = self.make_safe_move()
+        if move is not None:
+            return move
+        if not self.undecided:
+            return None
 
-        return None
+        # Every cell in a sentence is undecided, so the rest of the
+        # undecided pool is the cells no sentence mentions
+        constraints = self.constraints()
+        frontier = set().union(*[cells for cells, _ in constraints])
+        others = len(self.undecided) - len(frontier)
+        mines_left = None
+        if self.total_mines is not None:
+            mines_left = self.total_mines - len(self.mines)
+        probabilities, other = mine_probabilities(
+            constraints, others, mines_left
+        )
+
+        candidates = list(probabilities.items())
+        if others:
+            candidates.append((self.random_other(frontier), other))
+        lowest = min(probability for _, probability in candidates)
+        return random.choice([
+            cell for cell, probability in candidates
+            if probability == lowest
+        ])
+
+
+class BitmaskMinesweeperAI(MinesweeperAI):
+    """
+    Minesweeper game player that draws its inferences on MaskSentence
+    bitmasks. Cells are still (i, j) tuples at the public API, and in
+    self.mines, self.safes and self.moves_made.
+    """
+
+    def __init__(self, height=8, width=8, mines=None, inference="subset"):
+        super().__init__(height=height, width=width, mines=mines,
+                         inference=inference)
+
+        # Whether the cell at each board bit is known to be a mine or safe
+        self.marks = bytearray(height * width)
+
+        # Sentences are stored as MaskSentences
+        self.knowledge = KnowledgeBase(self.as_mask)
+
+    def to_sentence(self, cells, count):
+        """
+        Returns the MaskSentence for a collection of (i, j) cells.
+        """
+        cell_bits = [i * self.width + j for i, j in cells]
+        offset = min(cell_bits, default=0)
+        mask = 0
+        for bit in cell_bits:
+            mask |= 1 << (bit - offset)
+        return MaskSentence(mask, count, offset)
+
+    def to_cells(self, sentence):
+        """
+        Returns the set of (i, j) cells in a MaskSentence.
+        """
+        return set(divmod(bit, self.width) for bit in sentence.cell_bits())
+
+    def constraints(self):
+        return [(self.to_cells(sentence), sentence.count)
+                for sentence in self.knowledge.values()]
+
+    def as_mask(self, sentence):
+        """
+        Returns a sentence as a MaskSentence, converting it if needed.
+        """
+        if isinstance(sentence, Sentence):
+            return self.to_sentence(sentence.cells, sentence.count)
+        return sentence
+
+    def add_sentence(self, sentence):
+        """
+        Queues a sentence, converting it to a MaskSentence if needed.
+        """
+        self.pending.append(self.as_mask(sentence))
+
+    def cell_id(self, cell):
+        return cell[0] * self.width + cell[1]
+
+    def cell_at(self, ident):
+        return divmod(ident, self.width)
+
+    def cell_ids(self, sentence):
+        return sentence.cell_bits()
+
+    def marked(self, ident):
+        return self.marks[ident]
+
+    def record(self, ident, mine):
+        mark = self.MINE if mine else self.SAFE
+        if self.marks[ident] == mark:
+            return
+        self.marks[ident] = mark
+        super().record(ident, mine)
+
+    def is_subset(self, sentence, other):
+        if sentence.offset == other.offset and sentence.cells == other.cells:
+            return False
+        return sentence.issubset(other)
+
+    def difference(self, sentence, other):
+        return sentence.difference(other)
@@ -1,3 +1,4 @@
+import concurrent.futures
 import pygame
 import sys
 import time
@@ -8,6 +9,9 @@ HEIGHT = 8
 WIDTH = 8
 MINES = 8
 
+# Optional file that AI metrics are written to after every move
+METRICS_FILE = sys.argv[1] if len(sys.argv) > 1 else None
+
 # Colors
 BLACK = (0, 0, 0)
 GRAY = (180, 180, 180)
@@ -23,6 +27,7 @@ OPEN_SANS = "assets/fonts/OpenSans-Regular.ttf"
 smallFont = pygame.font.Font(OPEN_SANS, 20)
 mediumFont = pygame.font.Font(OPEN_SANS, 28)
 largeFont = pygame.font.Font(OPEN_SANS, 40)
+tinyFont = pygame.font.Font(OPEN_SANS, 14)
 
 # Compute board size
 BOARD_PADDING = 20
@@ -39,7 +44,12 @@ mine = pygame.transform.scale(mine, (cell_size, cell_size))
 
 # Create game and AI agent
 game = Minesweeper(height=HEIGHT, width=WIDTH, mines=MINES)
-ai = MinesweeperAI(height=HEIGHT, width=WIDTH)
+ai = MinesweeperAI(height=HEIGHT, width=WIDTH, mines=MINES)
+
+# The AI updates its knowledge on a worker thread, so that drawing
+# never waits for inference; `thinking` is the update in progress
+thinker = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+thinking = None
 
 # Keep track of revealed cells, flagged cells, and if a mine was hit
 revealed = set()
@@ -58,6 +68,13 @@ while True:
 
     screen.fill(BLACK)
 
+    # Collect the AI's latest update once it has finished
+    if thinking is not None and thinking.done():
+        thinking.result()
+        thinking = None
+        if METRICS_FILE is not None:
+            ai.metrics.dump(METRICS_FILE)
+
     # Show game instructions
     if instructions:
 
@@ -159,6 +176,16 @@ while True:
     textRect.center = ((5 / 6) * width, (2 / 3) * height)
     screen.blit(text, textRect)
 
+    # Display AI metrics
+    lines = ai.metrics.lines()
+    if thinking is not None:
+        lines.append("Thinking...")
+    for i, line in enumerate(lines):
+        line = tinyFont.render(line, True, WHITE)
+        lineRect = line.get_rect()
+        lineRect.center = ((5 / 6) * width, (2 / 3) * height + 30 + 18 * i)
+        screen.blit(line, lineRect)
+
     move = None
 
     left, _, right = pygame.mouse.get_pressed()
@@ -179,7 +206,8 @@ while True:
         mouse = pygame.mouse.get_pos()
 
         # If AI button clicked, make an AI move
-        if aiButton.collidepoint(mouse) and not lost:
+        # (once the AI has caught up with the moves so far)
+        if aiButton.collidepoint(mouse) and not lost and thinking is None:
             move = ai.make_safe_move()
             if move is None:
                 move = ai.make_random_move()
@@ -195,7 +223,8 @@ while True:
         # Reset game state
         elif resetButton.collidepoint(mouse):
             game = Minesweeper(height=HEIGHT, width=WIDTH, mines=MINES)
-            ai = MinesweeperAI(height=HEIGHT, width=WIDTH)
+            ai = MinesweeperAI(height=HEIGHT, width=WIDTH, mines=MINES)
+            thinking = None
             revealed = set()
             flags = set()
             lost = False
@@ -217,6 +246,6 @@ while True:
         else:
             nearby = game.nearby_mines(move)
             revealed.add(move)
-            ai.add_knowledge(move, nearby)
+            thinking = thinker.submit(ai.add_knowledge, move, nearby)
 
     pygame.display.flip()
@@ -0,0 +1,131 @@
+import argparse
+import concurrent.futures
+import json
+import random
+import time
+
+from minesweeper import Minesweeper, MinesweeperAI, BitmaskMinesweeperAI
+
+AIS = {
+    "sets": MinesweeperAI,
+    "bitmask": BitmaskMinesweeperAI,
+}
+
+
+def play(height, width, mines, seed, ai="sets", inference="subset"):
+    """
+    Plays one seeded game without a display, making the AI's safe move
+    when it has one and its guess otherwise.
+
+    Returns a dict describing the game: whether it was won, the number
+    of moves and guesses, each add_knowledge latency in seconds, and the
+    size of the knowledge base after each move.
+    """
+    random.seed(seed)
+    game = Minesweeper(height=height, width=width, mines=mines)
+    player = AIS[ai](height=height, width=width, mines=mines,
+                     inference=inference)
+
+    won = False
+    guesses = 0
+    latencies = []
+    sizes = []
+    while True:
+        move = player.make_safe_move()
+        if move is None:
+            move = player.make_random_move()
+            if move is None:
+                # Every safe cell has been revealed
+                won = True
+                break
+            guesses += 1
+        if game.is_mine(move):
+            break
+
+        player.add_knowledge(move, game.nearby_mines(move))
+        latencies.append(player.metrics.inference_time)
+        sizes.append(player.metrics.sentences)
+
+    return {
+        "seed": seed,
+        "won": won,
+        "moves": len(latencies),
+        "guesses": guesses,
+        "latencies": latencies,
+        "sizes": sizes,
+    }
+
+
+def percentile(values, p):
+    """Returns the p-th percentile of values by the nearest-rank method."""
+    if not values:
+        return None
+    values = sorted(values)
+    rank = max(1, -(-len(values) * p // 100))
+    return values[int(rank) - 1]
+
+
+def summarize(games, height, width, mines, elapsed):
+    """Combines the results of several games into one report."""
+    latencies = [x for game in games for x in game["latencies"]]
+    sizes = [x for game in games for x in game["sizes"]]
+    return {
+        "height": height,
+        "width": width,
+        "mines": mines,
+        "games": len(games),
+        "win_rate": sum(game["won"] for game in games) / len(games),
+        "guesses_per_game": sum(game["guesses"] for game in games)
+                            / len(games),
+        "moves_per_game": sum(game["moves"] for game in games) / len(games),
+        "add_knowledge_ms": {
+            f"p{p}": percentile(latencies, p) * 1000
+            for p in [50, 90, 99, 100]
+        } if latencies else None,
+        "knowledge_size": {
+            "mean": sum(sizes) / len(sizes),
+            "max": max(sizes),
+        } if sizes else None,
+        "seconds": elapsed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Play seeded Minesweeper games with the AI, without "
+                    "a display, and report how it did as JSON."
+    )
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--height", type=int, default=8)
+    parser.add_argument("--width", type=int, default=8)
+    parser.add_argument("--density", type=float, default=0.125,
+                        help="fraction of cells that are mines")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="seed of the first game; game i uses seed + i")
+    parser.add_argument("--processes", type=int, default=None,
+                        help="worker processes (default: one per CPU)")
+    parser.add_argument("--ai", choices=list(AIS), default="sets")
+    parser.add_argument("--inference", choices=["subset", "linear"],
+                        default="subset")
+    args = parser.parse_args()
+
+    mines = max(1, round(args.height * args.width * args.density))
+    start = time.perf_counter()
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=args.processes
+    ) as executor:
+        futures = [
+            executor.submit(play, args.height, args.width, mines,
+                            args.seed + i, args.ai, args.inference)
+            for i in range(args.games)
+        ]
+        games = [future.result() for future in futures]
+    elapsed = time.perf_counter() - start
+
+    report = summarize(games, args.height, args.width, mines, elapsed)
+    report.update(ai=args.ai, inference=args.inference, seed=args.seed)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
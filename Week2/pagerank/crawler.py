@@ -0,0 +1,147 @@
+import argparse
+import concurrent.futures
+import os
+import re
+import time
+
+import numpy
+
+# Bytes of HTML handed to the tokenizer at a time
+CHUNK_SIZE = 1 << 16
+
+
+# Opening <a> tags, and the href inside one; as long as hrefs do not
+# contain ">", every match of the pattern pagerank.crawl runs over a
+# whole page lies inside a single tag, so scanning tag by tag finds the
+# same links without backtracking across the page
+ANCHOR = re.compile(r"<a\s[^>]*>")
+HREF = re.compile(r"href=\"([^\"]*)\"")
+LINK = re.compile(r"<a\s+(?:[^>]*?)href=\"([^\"]*)\"")
+
+
+class LinkTokenizer:
+    """
+    Streaming tokenizer that collects the href of every <a> tag in the
+    chunks of HTML it is fed, keeping only an unfinished tag between
+    chunks rather than the whole page.
+    """
+
+    def __init__(self):
+        self.links = set()
+        self.pending = ""
+
+    def feed(self, chunk):
+        buffer = self.pending + chunk
+
+        # Scan up to the last complete tag, and carry over the rest
+        # from the first tag that has not been closed yet
+        end = buffer.rfind(">") + 1
+        for tag in ANCHOR.finditer(buffer, 0, end):
+            href = HREF.search(tag.group())
+            if href:
+                self.links.add(href.group(1))
+        rest = buffer.find("<", end)
+        self.pending = buffer[rest:] if rest != -1 else ""
+
+    def close(self):
+        # A page may end inside a tag that was never closed
+        self.links.update(LINK.findall(self.pending))
+        self.pending = ""
+        return self.links
+
+
+def parse_page(path):
+    """
+    Return the set of links on the HTML page at `path`, other than
+    links back to the page itself.
+    """
+    tokenizer = LinkTokenizer()
+    with open(path) as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            tokenizer.feed(chunk)
+    return tokenizer.close() - {os.path.basename(path)}
+
+
+def crawl(directory, processes=None, chunksize=64):
+    """
+    Parse a directory of HTML pages in a pool of worker processes and
+    return the same dictionary as pagerank.crawl: each page mapped to
+    the set of other pages in the corpus it links to.
+    """
+    filenames = sorted(
+        filename for filename in os.listdir(directory)
+        if filename.endswith(".html")
+    )
+    paths = [os.path.join(directory, filename) for filename in filenames]
+
+    with concurrent.futures.ProcessPoolExecutor(processes) as executor:
+        links = executor.map(parse_page, paths, chunksize=chunksize)
+        pages = dict(zip(filenames, links))
+
+    # Only include links to other pages in the corpus
+    for filename in pages:
+        pages[filename] = {
+            link for link in pages[filename]
+            if link in pages
+        }
+
+    return pages
+
+
+def write_edges(path, corpus):
+    """
+    Write a corpus to `path` as a compact edge list: the sorted page
+    names, and one (source, target) pair of uint32 page ids per link.
+    """
+    pages = sorted(corpus)
+    ids = {page: i for i, page in enumerate(pages)}
+    edges = numpy.array([
+        (ids[page], ids[link])
+        for page in pages
+        for link in sorted(corpus[page])
+    ], dtype=numpy.uint32).reshape(-1, 2)
+    with open(path, "wb") as f:
+        numpy.savez(f, pages=numpy.array(pages), edges=edges)
+
+
+def read_edges(path):
+    """
+    Return the corpus dictionary stored in an edge list written by
+    write_edges.
+    """
+    with numpy.load(path) as data:
+        pages = data["pages"].tolist()
+        edges = data["edges"]
+    corpus = {page: set() for page in pages}
+    for source, target in edges.tolist():
+        corpus[pages[source]].add(pages[target])
+    return corpus
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Crawl a directory of HTML pages into an edge list."
+    )
+    parser.add_argument("corpus")
+    parser.add_argument("--output", default="edges.npz",
+                        help="file to write the edge list to")
+    parser.add_argument("--processes", type=int, default=None,
+                        help="worker processes (default: CPU count)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    corpus = crawl(args.corpus, processes=args.processes)
+    write_edges(args.output, corpus)
+    elapsed = time.perf_counter() - start
+
+    links = sum(len(links) for links in corpus.values())
+    print(f"Crawled {len(corpus)} pages and {links} links "
+          f"in {elapsed:.2f}s ({len(corpus) / elapsed:.0f} pages/sec)")
+    print(f"Wrote edge list to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
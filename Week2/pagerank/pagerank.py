@@ -1,12 +1,35 @@
+import collections
+import math
 import os
 import random
 import re
 import sys
+import tempfile
 import numpy
 
 DAMPING = 0.85
 SAMPLES = 10000
 
+# Stop power iteration once the L1 change in ranks falls below this
+TOLERANCE = 1e-10
+
+# A corpus as compressed sparse row (CSR) arrays: the pages linked to by
+# pages[i] are pages[j] for j in indices[indptr[i]:indptr[i + 1]]
+Graph = collections.namedtuple("Graph", ["pages", "indptr", "indices"])
+
+# Ways iterate_pagerank can update ranks, and how many sweeps apart the
+# "aitken" mode extrapolates
+ITERATION_MODES = ("gauss-seidel", "jacobi", "aitken", "adaptive")
+AITKEN_PERIOD = 10
+
+# Forward push for personalized PageRank stops once no page holds more
+# than this much residual per link
+PUSH_TOLERANCE = 1e-9
+
+# Index file that crawl saves its parsed links to in a corpus directory
+INDEX_FILE = ".pagerank-index.npz"
+INDEX_VERSION = 1
+
 
 def main():
     
@@ -24,31 +47,171 @@ def main():
         print(f"  {page}: {ranks[page]:.4f}")
 
 
-def crawl(directory):
+def crawl(directory, index=True):
     """
     Parse a directory of HTML pages and check for links to other pages.
     Return a dictionary where each key is a page, and values are
     a list of all other pages in the corpus that are linked to by the page.
+
+    Unless `index` is False, the parsed links are saved to an index file
+    in the directory, and later crawls only re-parse pages whose size or
+    modification time has changed.
     """
+    # Pages are listed in sorted order whether or not they come from the
+    # index, so results that depend on page order are reproducible
+    files = dict()
+    for entry in sorted(os.scandir(directory), key=lambda entry: entry.name):
+        if entry.name.endswith(".html") and entry.is_file():
+            stat = entry.stat()
+            files[entry.name] = (stat.st_mtime_ns, stat.st_size)
+
+    cached = load_index(directory) if index else None
+    if cached is not None and cached.files == files:
+        return cached.corpus()
+
+    # Extract all links from HTML files, reusing the index for pages
+    # that have not changed
+    known = cached.files if cached is not None else dict()
     pages = dict()
-
-    # Extract all links from HTML files
-    for filename in os.listdir(directory):
-        if not filename.endswith(".html"):
-            continue
-        with open(os.path.join(directory, filename)) as f:
-            contents = f.read()
-            links = re.findall(r"<a\s+(?:[^>]*?)href=\"([^\"]*)\"", contents)
-            pages[filename] = set(links) - {filename}
+    for filename, stamp in files.items():
+        if known.get(filename) == stamp:
+            pages[filename] = cached.links(filename)
+        else:
+            pages[filename] = read_links(directory, filename)
 
     # Only include links to other pages in the corpus
+    corpus = dict()
     for filename in pages:
-        pages[filename] = set(
+        corpus[filename] = set(
             link for link in pages[filename]
             if link in pages
         )
 
-    return pages
+    if index:
+        save_index(directory, files, pages, corpus)
+    return corpus
+
+
+def read_links(directory, filename):
+    """
+    Return the set of links on an HTML page, other than links back to
+    the page itself, including links to pages outside the corpus.
+    """
+    with open(os.path.join(directory, filename)) as f:
+        contents = f.read()
+        links = re.findall(r"<a\s+(?:[^>]*?)href=\"([^\"]*)\"", contents)
+        return set(links) - {filename}
+
+
+def save_index(directory, files, pages, corpus):
+    """
+    Save a crawl to the directory's index file: the page table with
+    each page's modification time and size, the raw link targets of
+    each page as CSR arrays over a table of targets, and the corpus
+    links as CSR arrays over the page table.
+
+    The raw targets are kept so that links to pages added later can be
+    resolved without re-parsing the pages that link to them.
+    """
+    names = sorted(files)
+    targets = sorted(set().union(*pages.values()))
+    target_ids = {target: i for i, target in enumerate(targets)}
+    raw_indptr, raw_indices = csr([
+        [target_ids[target] for target in pages[name]] for name in names
+    ])
+    graph = link_graph(corpus)
+
+    # Write to a temporary file next to the index and move it into
+    # place, so an interrupted run never leaves a half-written index
+    path = os.path.join(directory, INDEX_FILE)
+    try:
+        fd, temporary = tempfile.mkstemp(
+            dir=directory, prefix=INDEX_FILE, suffix=".tmp"
+        )
+    except OSError:
+        # The index only saves time, so a read-only corpus is fine
+        return
+    try:
+        with os.fdopen(fd, "wb") as f:
+            numpy.savez(
+                f,
+                version=INDEX_VERSION,
+                pages=numpy.array(names, dtype=str),
+                mtimes=numpy.array(
+                    [files[name][0] for name in names], dtype=numpy.int64
+                ),
+                sizes=numpy.array(
+                    [files[name][1] for name in names], dtype=numpy.int64
+                ),
+                targets=numpy.array(targets, dtype=str),
+                raw_indptr=raw_indptr,
+                raw_indices=raw_indices,
+                indptr=graph.indptr,
+                indices=graph.indices,
+            )
+        os.replace(temporary, path)
+    except OSError:
+        pass
+    finally:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+
+
+def load_index(directory):
+    """
+    Return the crawl saved in the directory's index file as a LinkIndex,
+    or None if there is no usable index.
+    """
+    path = os.path.join(directory, INDEX_FILE)
+    try:
+        with numpy.load(path) as data:
+            if data["version"] != INDEX_VERSION:
+                return None
+            return LinkIndex(data)
+    except Exception:
+        # A missing, truncated or corrupt index is just rebuilt
+        return None
+
+
+class LinkIndex():
+    """
+    A crawl loaded from an index file. Links are only decoded from the
+    CSR arrays when asked for, so an unchanged corpus loads quickly.
+    """
+
+    def __init__(self, data):
+        self.names = data["pages"].tolist()
+        stamps = zip(data["mtimes"].tolist(), data["sizes"].tolist())
+        self.files = dict(zip(self.names, stamps))
+        self.rows = {name: i for i, name in enumerate(self.names)}
+        self.targets = data["targets"].tolist()
+        self.raw_indptr = data["raw_indptr"].tolist()
+        self.raw_indices = data["raw_indices"].tolist()
+        self.indptr = data["indptr"].tolist()
+        self.indices = data["indices"].tolist()
+
+    def links(self, name):
+        """
+        Return the raw link targets of a page, including those outside
+        the corpus.
+        """
+        i = self.rows[name]
+        return set(map(
+            self.targets.__getitem__,
+            self.raw_indices[self.raw_indptr[i]:self.raw_indptr[i + 1]]
+        ))
+
+    def corpus(self):
+        """
+        Return the dictionary crawl made from the indexed pages.
+        """
+        return {
+            name: set(map(
+                self.names.__getitem__,
+                self.indices[self.indptr[i]:self.indptr[i + 1]]
+            ))
+            for i, name in enumerate(self.names)
+        }
 
 
 def transition_model(corpus, page, damping_factor):
@@ -109,90 +272,548 @@ def sample_pagerank(corpus, damping_factor, n):
     their estimated PageRank value (a value between 0 and 1). All
     PageRank values should sum to 1.
     """
-    rank = dict()
-
-    # initialize rank of each page in the corpus to 0.0
-    for key in corpus:
-        rank[key] = 0.0
+    pages = list(corpus)
+
+    # build each page's transition table once: the transition model picks
+    # one of the page's links with probability `damping_factor`, and any
+    # page in the corpus with probability `1 - damping_factor`, which is
+    # the same as tossing a damping coin and then choosing uniformly from
+    # the links or from all pages; a page without links counts as
+    # linking to every page
+    links = dict()
+    for page in pages:
+        links[page] = tuple(sorted(
+            link for link in corpus[page] if link in corpus
+        )) or tuple(pages)
+
+    # start with a random sample page, then follow the transition model
+    # and count the visits to each page
+    visits = dict.fromkeys(pages, 0)
+    sample = random.choices(pages)[0]
+    visits[sample] += 1
+    for i in range(1, n):
 
-    # start with a random sample page and set its probability to 1/n
-    # n = no. of samples
-    sample = random.choices(list(corpus))[0]
-    rank[sample] += (1 / n)
+        if random.random() < damping_factor:
+            sample = random.choice(links[sample])
+        else:
+            sample = random.choice(pages)
+        visits[sample] += 1
 
-    # based on the transition model generated by this page, go to the next page
-    # increment the rank of the next page by 1 / n
-    for i in range(1, n):
+    return {page: count / n for page, count in visits.items()}
 
-        model = transition_model(corpus, sample, damping_factor)
-        next_pages = []
-        probabilities = []
-        for key, value in model.items():
-            next_pages.append(key)
-            probabilities.append(value)
-        
-        sample = random.choices(next_pages, weights=probabilities)[0]
-        rank[sample] += (1 / n)
 
-    return rank
+def walker_pagerank(corpus, damping_factor, n, walkers=None, burn_in=30,
+                    seed=None):
+    """
+    Return PageRank values for each page by moving many random surfers
+    at once with NumPy, counting `n` page visits in total.
 
+    Every step draws one number per surfer: below the damping factor the
+    surfer follows the link its page has at that point of the range, and
+    otherwise (or on a page with no links) it jumps to the page at that
+    point of the range. Surfers first take `burn_in` uncounted steps so
+    that their starting pages, drawn uniformly, do not bias the counts.
+    By default there are about sqrt(n) surfers, so that the burn-in and
+    the per-step overhead both stay small next to the counted steps.
 
-def iterate_pagerank(corpus, damping_factor):
+    Return a dictionary where keys are page names, and values are
+    their estimated PageRank value (a value between 0 and 1). All
+    PageRank values should sum to 1.
+    """
+    graph = link_graph(corpus)
+    N = len(graph.pages)
+    out_degree = numpy.diff(graph.indptr)
+    rng = numpy.random.default_rng(seed)
+    if walkers is None:
+        walkers = 4 * math.isqrt(n)
+    walkers = max(1, min(walkers, n))
+
+    # Scale each part of the range a draw falls in back to [0, 1)
+    follow_scale = 1 / damping_factor if damping_factor > 0 else 0
+    jump_scale = 1 / (1 - damping_factor) if damping_factor < 1 else 0
+
+    def step(positions):
+        """Return the pages the surfers at `positions` move to next."""
+        degree = out_degree[positions]
+        draws = rng.random(len(positions))
+        below = draws < damping_factor
+        follow = below & (degree > 0)
+        draws = numpy.where(below, draws * follow_scale,
+                            (draws - damping_factor) * jump_scale)
+
+        # Rounding can push a scaled draw up to 1, so clamp the picks
+        moved = numpy.minimum((draws * N).astype(numpy.int64), N - 1)
+        degree = degree[follow]
+        offsets = numpy.minimum(
+            (draws[follow] * degree).astype(numpy.int64), degree - 1
+        )
+        starts = graph.indptr[positions[follow]]
+        moved[follow] = graph.indices[starts + offsets]
+        return moved
+
+    positions = rng.integers(N, size=walkers)
+    for _ in range(burn_in):
+        positions = step(positions)
+
+    # Record visits until the budget is spent, and count them once at
+    # the end; the last round only records as many surfers as the
+    # budget has left
+    trail = numpy.empty(n, dtype=numpy.int64)
+    recorded = 0
+    while recorded < n:
+        counted = positions[:n - recorded]
+        trail[recorded:recorded + len(counted)] = counted
+        recorded += len(counted)
+        if recorded < n:
+            positions = step(positions)
+    visits = numpy.bincount(trail, minlength=N)
+
+    return dict(zip(graph.pages, (visits / n).tolist()))
+
+
+def iterate_pagerank(corpus, damping_factor, mode="gauss-seidel",
+                     telemetry=None, tolerance=None):
     """
     Return PageRank values for each page by iteratively updating
     PageRank values until convergence.
 
+    `mode` picks how the ranks are updated in each sweep over the pages:
+    "gauss-seidel" updates ranks in place, so later pages already see
+    the new ranks; "jacobi" computes every page from the previous sweep;
+    "aitken" is Jacobi with Aitken extrapolation every few sweeps; and
+    "adaptive" is Gauss-Seidel that stops recomputing pages once they
+    have converged, until a page that links to them changes again. If
+    `telemetry` is a list, a dict describing each sweep is appended to it.
+
+    By default iteration stops once no page changes by 0.0005 or more in
+    a sweep. If `tolerance` is given, it stops once the L1 norm of the
+    change in a sweep falls below `tolerance` instead, and a page counts
+    as converged once it changes by less than `tolerance` / N.
+
+    As in propagate, a page with no links is treated as linking to
+    every page, itself included.
+
     Return a dictionary where keys are page names, and values are
     their estimated PageRank value (a value between 0 and 1). All
     PageRank values should sum to 1.
     """
+    if mode not in ITERATION_MODES:
+        raise ValueError(f"unknown mode {mode!r}")
 
     ranks = dict()
 
+    # N = no. of pages
+    N = len(corpus)
+
     # set threshold of convergence to be +/- 0.001
-    threshold = 0.0005
+    threshold = 0.0005 if tolerance is None else tolerance / N
 
-    # N = no. of pages
     # set the rank of each page to be 1 / N
-    N = len(corpus)
     for key in corpus:
         ranks[key] = 1 / N
 
-    # for each page, determine which/how many other pages link to it
-    # then, apply the PageRank formula
+    # for each page, determine once which other pages link to it and
+    # how many links each of those has
+    incoming = {key: [] for key in corpus}
+    for page in corpus:
+        for link in corpus[page]:
+            if link in incoming:
+                incoming[link].append((page, len(corpus[page])))
+    dangling = [page for page in corpus if not corpus[page]]
+
+    # apply the PageRank formula to each page in turn
     # if change (new_rank, old_rank) < threshold update counter
     # if by the end of the loop, counter == N,
     # it means that the change in rank for each page in the corpus was within the threshold
     # so end the loop
     # return rank
+    history = collections.deque(maxlen=3)
+    frozen = set()
+    thawed = sum(ranks[page] for page in dangling)
+    iteration = 0
     while True:
 
-        count = 0
+        iteration += 1
+        updated = N - len(frozen)
+        count = len(frozen)
+        residual = 0
+        converged = set()
+        moved = []
+
+        # Jacobi-style modes read the ranks from the previous sweep,
+        # the others read them as they are updated
+        if mode == "jacobi" or mode == "aitken":
+            previous = dict(ranks)
+        else:
+            previous = ranks
+
+        # rank on pages with no links is shared out evenly; sweeps that
+        # update in place keep this total current as those pages change
+        spread = sum(previous[page] for page in dangling)
 
         for key in corpus:
 
+            if key in frozen:
+                continue
             new = (1 - damping_factor) / N
-            sigma = 0
-
-            for page in corpus:
+            sigma = spread / N
 
-                if key in corpus[page]:
-                    num_links = len(corpus[page])
-                    sigma = sigma + ranks[page] / num_links
+            for page, num_links in incoming[key]:
+                sigma = sigma + previous[page] / num_links
 
             sigma = damping_factor * sigma
             new += sigma
 
-            if abs(ranks[key] - new) < threshold:
+            change = abs(ranks[key] - new)
+            residual += change
+            if change < threshold:
                 count += 1
-            
+                converged.add(key)
+            else:
+                moved.append(key)
+
+            if previous is ranks and not corpus[key]:
+                spread += new - ranks[key]
             ranks[key] = new
-        
-        if count == N:
+
+        extrapolated = False
+        if mode == "aitken":
+            history.append(dict(ranks))
+            if iteration % AITKEN_PERIOD == 0 and len(history) == 3:
+                extrapolated = aitken(ranks, *history)
+                history.clear()
+        elif mode == "adaptive":
+            # converged pages keep their rank until a page linking to
+            # them moves again
+            frozen |= converged
+            for page in moved:
+                frozen.difference_update(corpus[page])
+
+            # pages with no links move every page a little, so thaw
+            # them all once that adds up to the threshold
+            if damping_factor * abs(spread - thawed) / N >= threshold:
+                frozen.clear()
+                thawed = spread
+
+        if telemetry is not None:
+            telemetry.append(dict(
+                iteration=iteration,
+                residual=residual,
+                updated=updated,
+                converged=count,
+                extrapolated=extrapolated,
+            ))
+
+        if extrapolated:
+            continue
+        if tolerance is None and count == N:
+            break
+        if tolerance is not None and residual < tolerance:
+            break
+
+    return ranks
+
+
+def aitken(ranks, first, second, third):
+    """
+    Replace the ranks with their Aitken extrapolation from the ranks of
+    three successive sweeps. Once the slowest mode dominates, each Jacobi
+    step is close to a fixed multiple of the one before; that multiple
+    is estimated from the last two steps (it is negative if they point
+    opposite ways), and the remaining steps are summed as a geometric
+    series. Return True if the ranks were changed.
+    """
+    earlier = {key: second[key] - first[key] for key in ranks}
+    last = {key: third[key] - second[key] for key in ranks}
+    size = sum(step * step for step in earlier.values())
+    if size == 0:
+        return False
+    ratio = sum(earlier[key] * last[key] for key in ranks) / size
+    if not -1 < ratio < 1:
+        return False
+    for key in ranks:
+        ranks[key] = third[key] + ratio / (1 - ratio) * last[key]
+    return True
+
+
+def link_graph(corpus):
+    """
+    Return the corpus as a Graph of CSR arrays, with pages in sorted
+    order and links that leave the corpus dropped.
+    """
+    pages = sorted(corpus)
+    ids = {page: i for i, page in enumerate(pages)}
+    indptr, indices = csr([
+        [ids[link] for link in corpus[page] if link in ids]
+        for page in pages
+    ])
+    return Graph(pages, indptr, indices)
+
+
+def csr(rows):
+    """
+    Return the indptr and indices arrays of a list of rows of integer
+    ids, with each row sorted.
+    """
+    indptr = numpy.zeros(len(rows) + 1, dtype=numpy.int64)
+    indices = []
+    for i, row in enumerate(rows):
+        indices.extend(sorted(row))
+        indptr[i + 1] = len(indices)
+    return indptr, numpy.array(indices, dtype=numpy.int64)
+
+
+def power_iterate(graph, damping_factor, ranks=None,
+                  tolerance=TOLERANCE, max_iterations=1000):
+    """
+    Return the PageRank vector of a Graph as a NumPy array, by power
+    iteration starting from `ranks` (uniform if not given).
+
+    Pages with no links are treated as linking to every page, so their
+    rank is spread evenly. Iteration stops once the L1 norm of the
+    change in ranks falls below `tolerance`.
+    """
+    N = len(graph.pages)
+    if ranks is None:
+        ranks = numpy.full(N, 1 / N)
+
+    for _ in range(max_iterations):
+        new = propagate(graph, damping_factor, ranks)
+        residual = numpy.abs(new - ranks).sum()
+        ranks = new
+        if residual < tolerance:
             break
 
     return ranks
 
 
+def propagate(graph, damping_factor, ranks):
+    """
+    Return the ranks after one step of the random surfer, starting
+    from the NumPy array `ranks`.
+    """
+    N = len(graph.pages)
+    out_degree = numpy.diff(graph.indptr)
+    sources = numpy.repeat(numpy.arange(N), out_degree)
+    dangling = out_degree == 0
+    linking = ~dangling
+
+    # Each page passes its rank on evenly along its links
+    share = numpy.zeros(N)
+    share[linking] = ranks[linking] / out_degree[linking]
+    new = numpy.bincount(graph.indices, weights=share[sources],
+                         minlength=N)
+    new += ranks[dangling].sum() / N
+    return (1 - damping_factor) / N + damping_factor * new
+
+
+def sparse_pagerank(corpus, damping_factor, tolerance=TOLERANCE):
+    """
+    Return PageRank values for each page by power iteration over a
+    sparse link matrix, which costs O(pages + links) per iteration.
+
+    Return a dictionary where keys are page names, and values are
+    their estimated PageRank value (a value between 0 and 1). All
+    PageRank values should sum to 1.
+    """
+    graph = link_graph(corpus)
+    ranks = power_iterate(graph, damping_factor, tolerance=tolerance)
+    return dict(zip(graph.pages, ranks.tolist()))
+
+
+def update_pagerank(corpus, ranks, damping_factor, added=(), removed=(),
+                    push=False, tolerance=TOLERANCE):
+    """
+    Return the corpus and its PageRank values after an edit, given the
+    PageRank values `ranks` from before the edit.
+
+    `added` and `removed` are iterables of (page, link) pairs; a page
+    first seen in `added` joins the corpus. Rather than starting over
+    from uniform ranks, the old ranks (with 1 / N for new pages) are used
+    as the starting point, so a small edit converges in a few steps.
+
+    If `push` is True, the error left by the edit is instead pushed out
+    locally: any page whose residual is above tolerance / N takes on its
+    residual and passes it along its links, so only pages near the edit
+    are touched.
+    """
+    corpus = {page: set(links) for page, links in corpus.items()}
+    for page, link in added:
+        corpus.setdefault(page, set()).add(link)
+        corpus.setdefault(link, set())
+    for page, link in removed:
+        corpus.get(page, set()).discard(link)
+
+    graph = link_graph(corpus)
+    N = len(graph.pages)
+    start = numpy.array([ranks.get(page, 1 / N) for page in graph.pages])
+    start /= start.sum()
+
+    if push:
+        new = push_residuals(graph, damping_factor, start, tolerance / N)
+    else:
+        new = power_iterate(graph, damping_factor, start, tolerance)
+    return corpus, dict(zip(graph.pages, new.tolist()))
+
+
+def push_residuals(graph, damping_factor, ranks, threshold):
+    """
+    Return the PageRank vector of a Graph as a NumPy array, by pushing
+    residuals from the approximate vector `ranks` until every page's
+    residual is below `threshold`.
+
+    A page's residual is how far its rank is from what one step of the
+    random surfer would give it. Pushing a page adds its residual to
+    its rank and passes `damping_factor` of it on along its links.
+    """
+    residuals = propagate(graph, damping_factor, ranks) - ranks
+
+    # A residual shared evenly by every page only scales the solution,
+    # which the ranks summing to 1 corrects for, so the even part of the
+    # residuals and whatever pages without links pass on to every page
+    # can be dropped rather than pushed
+    residuals -= numpy.median(residuals)
+
+    queue = collections.deque(
+        numpy.flatnonzero(numpy.abs(residuals) >= threshold).tolist()
+    )
+    ranks = ranks.tolist()
+    residuals = residuals.tolist()
+    indptr = graph.indptr.tolist()
+    indices = graph.indices.tolist()
+    queued = set(queue)
+    while queue:
+
+        page = queue.popleft()
+        queued.discard(page)
+        residual = residuals[page]
+        ranks[page] += residual
+        residuals[page] = 0
+
+        start, end = indptr[page], indptr[page + 1]
+        if start == end:
+            continue
+        share = damping_factor * residual / (end - start)
+        for target in indices[start:end]:
+            residuals[target] += share
+            if target not in queued and abs(residuals[target]) >= threshold:
+                queued.add(target)
+                queue.append(target)
+
+    ranks = numpy.array(ranks)
+    return ranks / ranks.sum()
+
+
+class PersonalizedPageRank():
+    """
+    Personalized PageRank over a corpus, where the random surfer jumps
+    to a set of seed pages instead of any page. Each seed page's vector
+    is computed by forward push and kept in an LRU cache, and queries
+    for several seeds combine the cached vectors.
+    """
+
+    def __init__(self, corpus, damping_factor=DAMPING,
+                 tolerance=PUSH_TOLERANCE, cache_size=128):
+        self.graph = link_graph(corpus)
+        self.ids = {page: i for i, page in enumerate(self.graph.pages)}
+        self.indptr = self.graph.indptr.tolist()
+        self.indices = self.graph.indices.tolist()
+        self.damping_factor = damping_factor
+        self.tolerance = tolerance
+        self.cache_size = cache_size
+        self.cache = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def ranks(self, seeds):
+        """
+        Return personalized PageRank values for each page, where `seeds`
+        is a page, an iterable of pages jumped to equally, or a dict
+        mapping pages to how often they are jumped to.
+
+        Return a dictionary where keys are page names, and values are
+        their PageRank value. All PageRank values sum to 1.
+        """
+        if isinstance(seeds, str):
+            seeds = {seeds: 1}
+        elif not isinstance(seeds, dict):
+            seeds = dict.fromkeys(seeds, 1)
+        if not seeds:
+            raise ValueError("at least one seed page is needed")
+
+        # The unnormalized vectors are linear in the seeds, so a query
+        # is their weighted sum, scaled to sum to 1
+        totals = collections.defaultdict(float)
+        for page, weight in seeds.items():
+            for i, value in self.seed_vector(page).items():
+                totals[i] += weight * value
+        scale = sum(totals.values())
+
+        ranks = dict.fromkeys(self.graph.pages, 0.0)
+        for i, value in totals.items():
+            ranks[self.graph.pages[i]] = value / scale
+        return ranks
+
+    def seed_vector(self, page):
+        """
+        Return the unnormalized personalized PageRank vector of a single
+        seed page as a dict from page ids to values, from the cache if
+        it is there.
+        """
+        if page not in self.ids:
+            raise KeyError(page)
+        if page in self.cache:
+            self.hits += 1
+            self.cache.move_to_end(page)
+            return self.cache[page]
+
+        self.misses += 1
+        vector = self.forward_push(self.ids[page])
+        self.cache[page] = vector
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return vector
+
+    def forward_push(self, seed):
+        """
+        Return the unnormalized personalized PageRank vector of the page
+        with id `seed` as a dict from page ids to values.
+
+        Starting with all the residual on the seed, any page holding more
+        than `tolerance` residual per link keeps 1 - `damping_factor` of
+        it and passes the rest evenly along its links. What reaches a
+        page without links is dropped, which the caller's normalization
+        turns into a jump back to the seeds.
+        """
+        damping_factor = self.damping_factor
+        ranks = collections.defaultdict(float)
+        residuals = collections.defaultdict(float)
+        residuals[seed] = 1.0
+        queue = collections.deque([seed])
+        queued = {seed}
+
+        while queue:
+
+            page = queue.popleft()
+            queued.discard(page)
+            residual = residuals.pop(page)
+            ranks[page] += (1 - damping_factor) * residual
+
+            start, end = self.indptr[page], self.indptr[page + 1]
+            if start == end:
+                continue
+            share = damping_factor * residual / (end - start)
+            for target in self.indices[start:end]:
+                residuals[target] += share
+                if target in queued:
+                    continue
+                degree = self.indptr[target + 1] - self.indptr[target]
+                if residuals[target] > self.tolerance * max(degree, 1):
+                    queued.add(target)
+                    queue.append(target)
+
+        return dict(ranks)
+
+
 if __name__ == "__main__":
     main()